@@ -0,0 +1,175 @@
+import datetime
+import os
+import shutil
+
+from esquema import es_confirmado
+
+# Almacenamiento columnar (Parquet) como alternativa a covid.db. Los reportes usan
+# pocas columnas, así que leer solo esas en formato columnar, comprimido y con los
+# textos repetidos codificados como diccionario, es mucho más barato que recorrer la
+# tabla de SQLite. Requiere pyarrow (opcional: solo se importa si se usa).
+RUTA_PARQUET = "covid_parquet"
+
+def importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+    except ImportError:
+        print("❌ Para usar Parquet hace falta instalar pyarrow (pip install pyarrow).")
+        return None
+    return pyarrow
+
+def esquema_parquet(pa):
+    texto = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("sexo", texto),
+        ("edad", pa.int16()),
+        ("edad_años_meses", texto),
+        ("residencia_pais_nombre", texto),
+        ("residencia_provincia_nombre", pa.string()),
+        ("residencia_departamento_nombre", texto),
+        ("carga_provincia_nombre", texto),
+        ("fallecido", pa.bool_()),
+        ("asistencia_respiratoria_mecanica", pa.bool_()),
+        ("origen_financiamiento", texto),
+        ("clasificacion", texto),
+        ("confirmado", pa.bool_()),
+        ("fecha_diagnostico", pa.date32()),
+    ])
+
+# Convierte un lote de filas normalizadas en un RecordBatch de Arrow
+def lote_a_arrow(pa, esquema, lote):
+    columnas = list(zip(*lote))
+    confirmados = [None if c is None else es_confirmado(c) for c in columnas[10]]
+    valores = [
+        columnas[0], columnas[1], columnas[2], columnas[3], columnas[4], columnas[5], columnas[6],
+        [None if v is None else v == 1 for v in columnas[7]],
+        [None if v is None else v == 1 for v in columnas[8]],
+        columnas[9], columnas[10], confirmados,
+        [None if f is None else datetime.date.fromisoformat(f) for f in columnas[11]],
+    ]
+    arrays = []
+    for campo, datos in zip(esquema, valores):
+        if pa.types.is_dictionary(campo.type):
+            arrays.append(pa.array(datos, pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(datos, campo.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=esquema)
+
+# Guarda los lotes de filas normalizadas (no vacíos) como dataset Parquet particionado
+# por provincia, en lugar del que hubiera en ruta_destino
+def escribir_parquet(pa, lotes, ruta_destino=RUTA_PARQUET):
+    esquema = esquema_parquet(pa)
+    if os.path.isdir(ruta_destino):
+        shutil.rmtree(ruta_destino)
+    pa.dataset.write_dataset(
+        (lote_a_arrow(pa, esquema, lote) for lote in lotes), ruta_destino, schema=esquema, format="parquet",
+        partitioning=["residencia_provincia_nombre"], partitioning_flavor="hive",
+        file_options=pa.dataset.ParquetFileFormat().make_write_options(compression="zstd"),
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+# Lecturas del dataset Parquet para los reportes. Cada una recorre solo las columnas
+# que usa, de a tamano_lote filas (sin cargar el dataset entero), y suma los
+# agregados parciales de cada lote.
+class DatasetParquet:
+    COLUMNAS_GRUPOS = ["residencia_provincia_nombre", "sexo", "clasificacion", "confirmado", "edad", "fallecido"]
+
+    def __init__(self, ruta, tamano_lote):
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+
+    def dataset(self):
+        import pyarrow.dataset
+        return pyarrow.dataset.dataset(self.ruta, format="parquet", partitioning="hive")
+
+    def lotes(self, columnas):
+        return self.dataset().to_batches(columns=columnas, batch_size=self.tamano_lote)
+
+    # Agrupa cada lote con group_by de Arrow y suma los parciales: {clave: [sumas...]}
+    @staticmethod
+    def sumar_parciales(parciales, tabla, claves, agregados):
+        columnas = [tabla[c].to_pylist() for c in claves + agregados]
+        for fila in zip(*columnas):
+            clave = fila[:len(claves)]
+            sumas = parciales.get(clave)
+            if sumas is None:
+                parciales[clave] = list(fila[len(claves):])
+            else:
+                for i, valor in enumerate(fila[len(claves):]):
+                    sumas[i] += valor
+
+    # (provincia, sexo, clasificación, confirmado, edad, fallecido, cantidad) por cada
+    # combinación de valores, con confirmado y fallecido como 0/1
+    def grupos(self):
+        import pyarrow as pa
+
+        conteo = {}
+        for lote in self.lotes(self.COLUMNAS_GRUPOS):
+            tabla = pa.Table.from_batches([lote]).group_by(self.COLUMNAS_GRUPOS).aggregate([([], "count_all")])
+            for fila in zip(*[tabla[c].to_pylist() for c in self.COLUMNAS_GRUPOS + ["count_all"]]):
+                conteo[fila[:-1]] = conteo.get(fila[:-1], 0) + fila[-1]
+        return [
+            (provincia, sexo, clasificacion, int(bool(confirmado)), edad,
+             None if fallecido is None else int(fallecido), cantidad)
+            for (provincia, sexo, clasificacion, confirmado, edad, fallecido), cantidad in conteo.items()
+        ]
+
+    def serie_diaria_por_provincia(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        columnas = ["residencia_provincia_nombre", "fecha_diagnostico", "confirmado", "fallecido"]
+        parciales = {}
+        for lote in self.lotes(columnas):
+            tabla = pa.Table.from_batches([lote])
+            tabla = tabla.filter(pc.and_(pc.is_valid(tabla["fecha_diagnostico"]), pc.is_valid(tabla["residencia_provincia_nombre"])))
+            confirmado = pc.fill_null(tabla["confirmado"], False)
+            tabla = pa.table({
+                "provincia": pc.cast(tabla["residencia_provincia_nombre"], pa.string()),
+                "fecha": pc.cast(tabla["fecha_diagnostico"], pa.string()),
+                "confirmados": pc.cast(confirmado, pa.int64()),
+                "fallecidos": pc.cast(pc.and_(confirmado, pc.fill_null(tabla["fallecido"], False)), pa.int64()),
+            })
+            tabla = tabla.group_by(["provincia", "fecha"]).aggregate([("confirmados", "sum"), ("fallecidos", "sum")])
+            self.sumar_parciales(parciales, tabla, ["provincia", "fecha"], ["confirmados_sum", "fallecidos_sum"])
+        return [clave + tuple(sumas) for clave, sumas in parciales.items()]
+
+    def departamentos_confirmados(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        columnas = ["residencia_provincia_nombre", "residencia_departamento_nombre", "confirmado",
+                    "fallecido", "asistencia_respiratoria_mecanica"]
+        parciales = {}
+        for lote in self.lotes(columnas):
+            tabla = pa.Table.from_batches([lote])
+            tabla = tabla.filter(pc.and_(pc.fill_null(tabla["confirmado"], False),
+                                         pc.is_valid(tabla["residencia_departamento_nombre"])))
+            tabla = pa.table({
+                "provincia": pc.cast(tabla["residencia_provincia_nombre"], pa.string()),
+                "departamento": pc.cast(tabla["residencia_departamento_nombre"], pa.string()),
+                "fallecidos": pc.cast(pc.fill_null(tabla["fallecido"], False), pa.int64()),
+                "arm": pc.cast(pc.fill_null(tabla["asistencia_respiratoria_mecanica"], False), pa.int64()),
+            })
+            tabla = tabla.group_by(["provincia", "departamento"]).aggregate(
+                [([], "count_all"), ("fallecidos", "sum"), ("arm", "sum")])
+            self.sumar_parciales(parciales, tabla, ["provincia", "departamento"], ["count_all", "fallecidos_sum", "arm_sum"])
+        return [clave + tuple(sumas) for clave, sumas in parciales.items()]
+
+    # Valores distintos de cada columna pedida como texto ("SI"/"NO" las binarias), en
+    # el orden en que aparecen (las fechas, ordenadas)
+    def valores(self, columnas):
+        import pyarrow.compute as pc
+
+        si_no = {True: "SI", False: "NO"}
+        valores = {var: {} for var in columnas}
+        for lote in self.lotes(columnas):
+            for var in columnas:
+                for valor in pc.unique(lote.column(var)).to_pylist():
+                    if valor is not None:
+                        valores[var][si_no.get(valor, valor) if isinstance(valor, bool) else str(valor)] = True
+        if "fecha_diagnostico" in valores:
+            valores["fecha_diagnostico"] = dict.fromkeys(sorted(valores["fecha_diagnostico"]))
+        return {var: list(v) for var, v in valores.items()}
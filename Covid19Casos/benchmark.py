@@ -0,0 +1,337 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+# Banco de pruebas de rendimiento de ejercicios.py sin el CSV del gobierno: genera
+# un CSV sintético con las mismas 12 columnas y distribuciones parecidas a las
+# reales (siempre igual para la misma semilla), mide la carga, cada reporte y la
+# corrida completa, y compara contra una línea base guardada. Cada escenario corre
+# en un proceso aparte, así la memoria pico que se mide es solo la suya.
+#
+#   python benchmark.py generar --filas 1000000
+#   python benchmark.py correr --tamano 1M --guardar
+#   python benchmark.py correr --tamano 1M        (falla si hay regresiones)
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+RUTA_BASELINE = os.path.join(DIRECTORIO, "benchmark_baseline.json")
+RUTA_DATOS = "bench_datos"
+RUTA_CENSO = os.path.join(os.path.dirname(DIRECTORIO), "censo2022.csv")
+SEMILLA = 2020
+TAMANOS = {"100k": 100_000, "1M": 1_000_000, "10M": 10_000_000, "50M": 50_000_000}
+REPETICIONES = 3
+TOLERANCIA = 0.2  # cuánto puede empeorar (20 %) antes de contar como regresión
+
+COLUMNAS = [
+    "sexo", "edad", "edad_años_meses", "residencia_pais_nombre", "residencia_provincia_nombre",
+    "residencia_departamento_nombre", "carga_provincia_nombre", "fallecido",
+    "asistencia_respiratoria_mecanica", "origen_financiamiento", "clasificacion", "fecha_diagnostico",
+]
+
+# Provincias con un peso aproximado a su cantidad de casos, y algunos departamentos
+PROVINCIAS = {
+    "Buenos Aires": (38, ["La Matanza", "La Plata", "General Pueyrredón", "Lomas de Zamora", "Quilmes", "Bahía Blanca"]),
+    "CABA": (15, [f"Comuna {i}" for i in range(1, 16)]),
+    "Córdoba": (9, ["Capital", "Río Cuarto", "Colón", "San Justo"]),
+    "Santa Fe": (9, ["Rosario", "La Capital", "General López", "Castellanos"]),
+    "Mendoza": (4, ["Capital", "Godoy Cruz", "Guaymallén", "Las Heras"]),
+    "Tucumán": (4, ["Capital", "Cruz Alta", "Tafí Viejo"]),
+    "Entre Ríos": (3, ["Paraná", "Concordia", "Gualeguaychú"]),
+    "Neuquén": (3, ["Confluencia", "Zapala"]),
+    "Salta": (2, ["Capital", "Orán"]),
+    "Chubut": (2, ["Rawson", "Escalante"]),
+    "Río Negro": (2, ["General Roca", "Bariloche"]),
+    "Santiago del Estero": (2, ["Capital", "Banda"]),
+    "Chaco": (2, ["San Fernando", "Comandante Fernández"]),
+    "San Juan": (2, ["Capital", "Rawson"]),
+    "Corrientes": (1, ["Capital", "Goya"]),
+    "Misiones": (1, ["Capital", "Oberá"]),
+    "Jujuy": (1, ["Doctor Manuel Belgrano", "Palpalá"]),
+    "San Luis": (1, ["Juan Martín de Pueyrredón", "General Pedernera"]),
+    "La Pampa": (1, ["Capital", "Maracó"]),
+    "Santa Cruz": (1, ["Güer Aike", "Deseado"]),
+    "Tierra del Fuego": (1, ["Ushuaia", "Río Grande"]),
+    "Catamarca": (1, ["Capital", "Valle Viejo"]),
+    "La Rioja": (1, ["Capital", "Chilecito"]),
+    "Formosa": (1, ["Formosa", "Pilcomayo"]),
+    "SIN ESPECIFICAR": (1, ["SIN ESPECIFICAR"]),
+}
+
+# Clasificaciones con su peso (las "confirmado" cuentan como casos confirmados)
+CLASIFICACIONES = [
+    ("Caso confirmado por laboratorio - No activo (por tiempo de evolución)", 30),
+    ("Caso confirmado por criterio clínico-epidemiológico - No activo (por tiempo de evolución)", 10),
+    ("Caso confirmado por laboratorio - Activo", 3),
+    ("Caso Descartado", 45),
+    ("Caso sospechoso - No activo - Sin Clasificar", 12),
+]
+
+# Olas de contagios: (centro, desvío en días, peso)
+OLAS = [
+    (datetime.date(2020, 10, 15), 40, 25),
+    (datetime.date(2021, 5, 20), 30, 35),
+    (datetime.date(2022, 1, 12), 15, 40),
+]
+PRIMER_DIA = datetime.date(2020, 3, 3)
+ULTIMO_DIA = datetime.date(2022, 6, 30)
+
+TAMANO_BLOQUE = 100_000
+
+# Escribe el CSV sintético por bloques. Las columnas que dependen de otras (la
+# muerte depende de la edad y de que el caso sea confirmado) se sortean en ese orden.
+def generar_csv(ruta, filas, semilla=SEMILLA):
+    azar = random.Random(semilla)
+    provincias = list(PROVINCIAS)
+    # Pesos acumulados para random.choices (cum_weights es más rápido que weights)
+    pesos_provincias = list(itertools.accumulate(peso for peso, _ in PROVINCIAS.values()))
+    clasificaciones = [nombre for nombre, _ in CLASIFICACIONES]
+    pesos_clasificaciones = list(itertools.accumulate(peso for _, peso in CLASIFICACIONES))
+    pesos_olas = list(itertools.accumulate(peso for _, _, peso in OLAS))
+    # Las fechas se convierten a texto una sola vez
+    dias = (ULTIMO_DIA - PRIMER_DIA).days
+    fechas = [(PRIMER_DIA + datetime.timedelta(days=d)).isoformat() for d in range(dias + 1)]
+
+    inicio = time.perf_counter()
+    with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+        escritor = csv.writer(archivo, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        escritor.writerow(COLUMNAS)
+        restantes = filas
+        while restantes:
+            n = min(restantes, TAMANO_BLOQUE)
+            restantes -= n
+            bloque = []
+            for provincia, clasificacion, ola in zip(azar.choices(provincias, cum_weights=pesos_provincias, k=n),
+                                                     azar.choices(clasificaciones, cum_weights=pesos_clasificaciones, k=n),
+                                                     azar.choices(OLAS, cum_weights=pesos_olas, k=n)):
+                sorteo = azar.random()
+                sexo = "F" if sorteo < 0.49 else "M" if sorteo < 0.98 else "NR"
+
+                # Edad: casi siempre en años (una parte sin dato), bebés en meses
+                sorteo = azar.random()
+                if sorteo < 0.03:
+                    edad, unidad = "", ""
+                elif sorteo < 0.04:
+                    edad, unidad = str(azar.randint(1, 11)), "Meses"
+                else:
+                    edad, unidad = str(min(105, max(0, int(azar.gauss(40, 19))))), "Años"
+
+                confirmado = "confirmado" in clasificacion
+                riesgo = 0.002 + (int(edad) / 100) ** 4 * 0.2 if unidad == "Años" else 0.002
+                fallecido = confirmado and azar.random() < riesgo
+                arm = confirmado and azar.random() < (0.3 if fallecido else 0.004)
+
+                # Fecha de diagnóstico alrededor de alguna ola (una parte sin dato)
+                if azar.random() < 0.05:
+                    fecha = ""
+                else:
+                    centro, desvio, _ = ola
+                    dia = (centro - PRIMER_DIA).days + int(azar.gauss(0, desvio))
+                    fecha = fechas[min(dias, max(0, dia))]
+
+                departamento = azar.choice(PROVINCIAS[provincia][1])
+                carga = provincia if azar.random() < 0.97 else azar.choice(provincias)
+                bloque.append([
+                    sexo, edad, unidad, "Argentina", provincia, departamento, carga,
+                    "SI" if fallecido else "NO", "SI" if arm else "NO",
+                    "Público" if azar.random() < 0.7 else "Privado", clasificacion, fecha,
+                ])
+            escritor.writerows(bloque)
+    segundos = time.perf_counter() - inicio
+    print(f"✅ {ruta}: {filas} filas generadas en {segundos:.1f} s.")
+
+def ruta_csv(filas, semilla=SEMILLA, directorio=RUTA_DATOS):
+    return os.path.join(directorio, f"casos_{filas}_{semilla}.csv")
+
+def preparar_csv(filas, semilla=SEMILLA, directorio=RUTA_DATOS):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = ruta_csv(filas, semilla, directorio)
+    if not os.path.exists(ruta):
+        generar_csv(ruta, filas, semilla)
+    return ruta
+
+# Escenarios: nombre → lo que se mide (dentro del proceso hijo, con ejercicios ya importado)
+ESCENARIOS = [
+    "carga",
+    "carga_paralela",
+    "punto1", "punto2", "punto3", "punto4", "punto5", "punto6", "punto7", "punto8", "punto9",
+    "todos",
+    "todos_paralelo",
+]
+
+def correr_escenario(escenario, ejercicios):
+    if escenario == "carga":
+        ejercicios.crear_tabla()
+        ejercicios.cargar_datos()
+    elif escenario == "carga_paralela":
+        ejercicios.crear_tabla()
+        ejercicios.cargar_datos(procesos=os.cpu_count() or 1)
+    elif escenario == "todos":
+        ejercicios.ejecutar_todos()
+    elif escenario == "todos_paralelo":
+        ejercicios.ejecutar_en_paralelo()
+    else:
+        ejercicios.REPORTES[escenario]()
+
+# Memoria pico del proceso en MB (None donde no está el módulo resource, como en Windows)
+def memoria_pico_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo informa en KB y macOS en bytes
+    return pico / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+# Proceso hijo: ejecuta un escenario sobre los archivos de directorio y escribe
+# {"segundos": ..., "memoria_mb": ...} en stdout. Lo que imprimen los reportes se descarta.
+def medir(escenario, ruta_csv_datos, directorio):
+    sys.path.insert(0, DIRECTORIO)
+    import ejercicios
+
+    ruta_csv_datos = os.path.abspath(ruta_csv_datos)
+    os.chdir(directorio)
+    ejercicios.RUTA_CSV = ruta_csv_datos
+    ejercicios.RUTA_DB = "bench.db"
+    ejercicios.USAR_CACHE = False
+
+    salida = sys.stdout
+    with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+        inicio = time.perf_counter()
+        correr_escenario(escenario, ejercicios)
+        segundos = time.perf_counter() - inicio
+        ejercicios.cerrar_sesion()
+    json.dump({"segundos": segundos, "memoria_mb": memoria_pico_mb()}, salida)
+
+def medir_en_proceso(escenario, ruta, directorio):
+    # Los reportes buscan el censo en el directorio de trabajo
+    if os.path.exists(RUTA_CENSO):
+        shutil.copy(RUTA_CENSO, directorio)
+    resultado = subprocess.run([sys.executable, os.path.abspath(__file__), "medir", escenario, ruta, directorio],
+                               capture_output=True, text=True, encoding="utf-8")
+    if resultado.returncode != 0:
+        raise RuntimeError(f"El escenario {escenario} falló:\n{resultado.stderr}")
+    return json.loads(resultado.stdout)
+
+# Cada escenario se repite y se queda el mejor tiempo (el menos afectado por otros
+# procesos de la máquina) y la mayor memoria. Los reportes usan la base que dejó la
+# última carga, así que las cargas van primero.
+def correr(filas, semilla=SEMILLA, repeticiones=REPETICIONES, escenarios=None):
+    ruta = preparar_csv(filas, semilla)
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    resultados = {}
+    print(f"\n{'Escenario':<16} {'Mejor (s)':>10} {'Filas/s':>12} {'Memoria (MB)':>13}")
+    print("-" * 54)
+    for escenario in escenarios or ESCENARIOS:
+        mediciones = [medir_en_proceso(escenario, ruta, directorio) for _ in range(repeticiones)]
+        segundos = min(medicion["segundos"] for medicion in mediciones)
+        memorias = [medicion["memoria_mb"] for medicion in mediciones if medicion["memoria_mb"] is not None]
+        memoria = max(memorias) if memorias else None
+        resultados[escenario] = {"segundos": segundos, "filas_por_segundo": filas / segundos, "memoria_mb": memoria}
+        texto_memoria = "-" if memoria is None else f"{memoria:.1f}"
+        print(f"{escenario:<16} {segundos:>10.3f} {filas / segundos:>12.0f} {texto_memoria:>13}")
+    return resultados
+
+# Con presupuesto de memoria los resultados no son comparables con los de sin presupuesto
+def clave_baseline(filas, semilla, memoria=None):
+    return f"{filas}_{semilla}" + (f"_{memoria}mb" if memoria else "")
+
+def leer_baselines(ruta=RUTA_BASELINE):
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+def guardar_baseline(resultados, filas, semilla, memoria=None, ruta=RUTA_BASELINE):
+    baselines = leer_baselines(ruta)
+    baselines[clave_baseline(filas, semilla, memoria)] = {
+        "fecha": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "escenarios": resultados,
+    }
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(baselines, archivo, ensure_ascii=False, indent=2)
+    print(f"\n💾 Línea base guardada en {ruta}.")
+
+# Lista de regresiones: menos filas por segundo o más memoria que la línea base,
+# más allá de la tolerancia
+def comparar(resultados, baseline, tolerancia=TOLERANCIA):
+    regresiones = []
+    for escenario, actual in resultados.items():
+        base = baseline["escenarios"].get(escenario)
+        if base is None:
+            continue
+        if actual["filas_por_segundo"] < base["filas_por_segundo"] * (1 - tolerancia):
+            regresiones.append(f"{escenario}: {actual['filas_por_segundo']:.0f} filas/s "
+                               f"(línea base {base['filas_por_segundo']:.0f})")
+        if actual["memoria_mb"] is not None and base["memoria_mb"] is not None \
+                and actual["memoria_mb"] > base["memoria_mb"] * (1 + tolerancia):
+            regresiones.append(f"{escenario}: {actual['memoria_mb']:.1f} MB (línea base {base['memoria_mb']:.1f} MB)")
+    return regresiones
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Benchmarks de ejercicios.py con datos sintéticos.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    generar = comandos.add_parser("generar", help="genera un CSV sintético")
+    generar.add_argument("--filas", type=int, default=TAMANOS["100k"])
+    generar.add_argument("--semilla", type=int, default=SEMILLA)
+    generar.add_argument("--salida", help=f"archivo de salida (por defecto en {RUTA_DATOS}/)")
+
+    correr_parser = comandos.add_parser("correr", help="mide los escenarios y los compara con la línea base")
+    correr_parser.add_argument("--tamano", choices=TAMANOS, default="100k")
+    correr_parser.add_argument("--filas", type=int, help="cantidad de filas (en lugar de --tamano)")
+    correr_parser.add_argument("--semilla", type=int, default=SEMILLA)
+    correr_parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    correr_parser.add_argument("--escenario", action="append", choices=ESCENARIOS, help="solo estos escenarios")
+    correr_parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    correr_parser.add_argument("--guardar", action="store_true", help="guarda el resultado como línea base")
+    correr_parser.add_argument("--memoria", type=int, metavar="MB", help="corre ejercicios.py con ese presupuesto de memoria")
+
+    medir_parser = comandos.add_parser("medir")  # uso interno: un escenario en un proceso hijo
+    medir_parser.add_argument("escenario", choices=ESCENARIOS)
+    medir_parser.add_argument("csv")
+    medir_parser.add_argument("directorio")
+
+    args = parser.parse_args(argv)
+    if args.comando == "generar":
+        if args.salida:
+            generar_csv(args.salida, args.filas, args.semilla)
+        else:
+            preparar_csv(args.filas, args.semilla)
+        return 0
+    if args.comando == "medir":
+        medir(args.escenario, args.csv, args.directorio)
+        return 0
+
+    filas = args.filas or TAMANOS[args.tamano]
+    if args.memoria:
+        # Los procesos hijos heredan la variable y ejercicios.py la aplica al importarse
+        os.environ["COVID_MEMORIA_MB"] = str(args.memoria)
+    resultados = correr(filas, args.semilla, args.repeticiones, args.escenario)
+    if args.guardar:
+        guardar_baseline(resultados, filas, args.semilla, args.memoria)
+        return 0
+
+    baseline = leer_baselines().get(clave_baseline(filas, args.semilla, args.memoria))
+    if baseline is None:
+        print("\n⚠️ No hay línea base para este tamaño y semilla. Use --guardar para crearla.")
+        return 0
+    regresiones = comparar(resultados, baseline, args.tolerancia)
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones respecto de la línea base del {baseline['fecha']}:")
+        for regresion in regresiones:
+            print(f"   {regresion}")
+        return 1
+    print(f"\n✅ Sin regresiones respecto de la línea base del {baseline['fecha']} (tolerancia {args.tolerancia:.0%}).")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
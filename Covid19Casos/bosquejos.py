@@ -0,0 +1,192 @@
+import array
+import collections
+import hashlib
+import json
+import math
+import operator
+import random
+
+from esquema import COLUMNAS_CASOS, COLUMNAS_CODIFICADAS, VARIABLES
+from perfil import perfilado
+
+# Bosquejos para el modo aproximado, armados durante la carga con los mismos lotes
+# que se insertan (sin otra pasada por el CSV):
+# - HyperLogLog por variable: cantidad de valores distintos con ~1.6 % de error.
+# - Count-min por variable: cuántos casos tiene cada valor (nunca de menos; de más
+#   a lo sumo EPSILON_CMS del total con probabilidad 1 - DELTA_CMS), más los
+#   valores más frecuentes según la tabla completa.
+# - Muestra estratificada por provincia y sexo: hasta TAMANO_MUESTRA_ESTRATO filas
+#   de cada estrato elegidas al azar (reservoir sampling), para estimar
+#   proporciones y promedios con su intervalo de confianza.
+# Son chicos y se leen en milisegundos; los números finales siguen saliendo del modo exacto.
+PRECISION_HLL = 12  # 2^12 registros: error estándar 1.04 / 64 ≈ 1.6 %
+EPSILON_CMS = 0.001
+DELTA_CMS = 0.01
+CANDIDATOS_TOP = 20  # valores más frecuentes que guarda cada count-min
+MAXIMO_CANDIDATOS = 10000  # valores distintos entre los que se eligen
+TAMANO_MUESTRA_ESTRATO = 500
+SEMILLA_MUESTRA = 2020
+
+# Hash de 64 bits estable entre ejecuciones (el hash() de Python cambia con cada proceso)
+def hash64(valor):
+    return int.from_bytes(hashlib.blake2b(repr(valor).encode(), digest_size=8).digest(), "little")
+
+class HyperLogLog:
+    def __init__(self, precision=PRECISION_HLL, registros=None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registros = bytearray(self.m) if registros is None else bytearray(registros)
+
+    def agregar(self, valor):
+        h = hash64(valor)
+        bits = 64 - self.precision
+        resto = h & ((1 << bits) - 1)
+        i = h >> bits
+        rango = bits - resto.bit_length() + 1
+        if rango > self.registros[i]:
+            self.registros[i] = rango
+
+    def estimar(self):
+        alfa = 0.7213 / (1 + 1.079 / self.m)
+        estimado = alfa * self.m * self.m / sum(2.0 ** -r for r in self.registros)
+        vacios = self.registros.count(0)
+        # Con pocos valores distintos es más exacto contar los registros vacíos
+        if estimado <= 2.5 * self.m and vacios:
+            estimado = self.m * math.log(self.m / vacios)
+        return estimado
+
+    # Mitad del intervalo de confianza del 95 %
+    def error(self, estimado):
+        return 1.96 * 1.04 / math.sqrt(self.m) * estimado
+
+class CountMin:
+    def __init__(self, epsilon=EPSILON_CMS, delta=DELTA_CMS, tablas=None, total=0, candidatos=None):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.ancho = math.ceil(math.e / epsilon)
+        self.profundidad = math.ceil(math.log(1 / delta))
+        self.tablas = array.array("q", bytes(8 * self.ancho * self.profundidad)) if tablas is None else tablas
+        self.total = total
+        self.candidatos = dict(candidatos or {})
+
+    # Una posición por fila, con doble hashing a partir de un solo hash de 64 bits
+    def posiciones(self, valor):
+        h = hash64(valor)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return [fila * self.ancho + (h1 + fila * h2) % self.ancho for fila in range(self.profundidad)]
+
+    def agregar(self, valor, cantidad=1):
+        posiciones = self.posiciones(valor)
+        for posicion in posiciones:
+            self.tablas[posicion] += cantidad
+        self.total += cantidad
+        self.candidatos[valor] = min(self.tablas[posicion] for posicion in posiciones)
+        # Con demasiados valores distintos quedan los que más casos tenían hasta acá.
+        # Solo en ese caso los candidatos dependen de cómo se partieron las filas en lotes.
+        if len(self.candidatos) > MAXIMO_CANDIDATOS:
+            mayores = sorted(self.candidatos.items(), key=lambda candidato: -candidato[1])
+            self.candidatos = dict(mayores[:MAXIMO_CANDIDATOS // 2])
+
+    def estimar(self, valor):
+        return min(self.tablas[posicion] for posicion in self.posiciones(valor))
+
+    # Los más frecuentes con los conteos de la tabla completa (no los del momento en
+    # que se vio cada valor) y los empates por valor: así la carga en serie y la
+    # paralela, que cortan las filas en lotes distintos, guardan los mismos
+    def top(self, cantidad=CANDIDATOS_TOP):
+        estimados = [(valor, self.estimar(valor)) for valor in self.candidatos]
+        return sorted(estimados, key=lambda candidato: (-candidato[1], candidato[0]))[:cantidad]
+
+# Variables con bosquejos y la posición de su columna en una fila codificada de casos
+POSICIONES_BOSQUEJOS = {var: COLUMNAS_CASOS.index(COLUMNAS_CODIFICADAS[var][0] if var in COLUMNAS_CODIFICADAS else var)
+                        for var, _, _ in VARIABLES}
+POSICION_PROVINCIA = COLUMNAS_CASOS.index("residencia_provincia_id")
+POSICION_SEXO = COLUMNAS_CASOS.index("sexo_id")
+
+class Bosquejos:
+    def __init__(self, tamano_estrato=TAMANO_MUESTRA_ESTRATO, semilla=SEMILLA_MUESTRA):
+        self.hll = {var: HyperLogLog() for var in POSICIONES_BOSQUEJOS}
+        self.cms = {var: CountMin() for var in POSICIONES_BOSQUEJOS}
+        self.tamano_estrato = tamano_estrato
+        self.azar = random.Random(semilla)
+        self.estratos = {}  # (provincia_id, sexo_id) → [filas vistas, muestra]
+
+    # Lote de filas ya codificadas. Cada valor distinto del lote actualiza los
+    # bosquejos una sola vez, con su cantidad.
+    def agregar_lote(self, lote):
+        if not lote:
+            return
+        # Cada columna se cuenta directo de las filas (transponer el lote cuesta más)
+        for var, posicion in POSICIONES_BOSQUEJOS.items():
+            conteo = collections.Counter(map(operator.itemgetter(posicion), lote))
+            conteo.pop(None, None)
+            for valor, cantidad in conteo.items():
+                self.hll[var].agregar(valor)
+                self.cms[var].agregar(valor, cantidad)
+
+        # Este recorrido es por fila, así que va con lo mínimo: random() en lugar de
+        # randrange() (que está escrita en Python) y las búsquedas fuera del ciclo
+        estratos, tamano, azar = self.estratos, self.tamano_estrato, self.azar.random
+        for fila, clave in zip(lote, map(operator.itemgetter(POSICION_PROVINCIA, POSICION_SEXO), lote)):
+            estrato = estratos.get(clave)
+            if estrato is None:
+                estrato = estratos[clave] = [0, []]
+            estrato[0] += 1
+            muestra = estrato[1]
+            if len(muestra) < tamano:
+                muestra.append(fila)
+            else:
+                i = int(azar() * estrato[0])
+                if i < tamano:
+                    muestra[i] = fila
+
+    def guardar(self, cur):
+        for tabla in ["muestra", "estratos", "bosquejos"]:
+            cur.execute(f"DELETE FROM {tabla}")
+        for (provincia_id, sexo_id), (poblacion, filas) in self.estratos.items():
+            cur.execute("INSERT INTO estratos VALUES (?, ?, ?)", (provincia_id, sexo_id, poblacion))
+            cur.executemany("INSERT INTO muestra VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", filas)
+        for var, hll in self.hll.items():
+            cur.execute("INSERT INTO bosquejos VALUES (?, 'hll', ?, ?)",
+                        (var, json.dumps({"precision": hll.precision}), bytes(hll.registros)))
+        for var, cms in self.cms.items():
+            parametros = {"epsilon": cms.epsilon, "delta": cms.delta, "total": cms.total, "candidatos": cms.top()}
+            cur.execute("INSERT INTO bosquejos VALUES (?, 'cms', ?, ?)",
+                        (var, json.dumps(parametros, ensure_ascii=False), cms.tablas.tobytes()))
+
+# {(provincia_id, sexo_id): (población, filas de la muestra)}
+def leer_muestra(conn):
+    estratos = {(provincia_id, sexo_id): (poblacion, [])
+                for provincia_id, sexo_id, poblacion in conn.execute("SELECT provincia_id, sexo_id, poblacion FROM estratos")}
+    for fila in conn.execute("SELECT * FROM muestra"):
+        estratos[(fila[POSICION_PROVINCIA], fila[POSICION_SEXO])][1].append(fila)
+    return estratos
+
+# Bosquejos guardados en la base, para seguir sumándoles filas: una carga completa
+# agrega a lo que ya estaba cargado, y una incremental que solo insertó suma las nuevas.
+def leer_bosquejos(cur):
+    bosquejos = Bosquejos()
+    for var, tipo, parametros, datos in cur.execute("SELECT variable, tipo, parametros, datos FROM bosquejos").fetchall():
+        parametros = json.loads(parametros)
+        if tipo == "hll":
+            bosquejos.hll[var] = HyperLogLog(parametros["precision"], datos)
+        else:
+            tablas = array.array("q")
+            tablas.frombytes(datos)
+            bosquejos.cms[var] = CountMin(parametros["epsilon"], parametros["delta"], tablas, parametros["total"],
+                                          parametros["candidatos"])
+    bosquejos.estratos = {clave: [poblacion, filas] for clave, (poblacion, filas) in leer_muestra(cur).items()}
+    return bosquejos
+
+# Cuando la carga incremental borra filas, ni el HyperLogLog ni la muestra pueden
+# descontarlas: se vuelven a armar recorriendo casos.
+@perfilado
+def reconstruir_bosquejos(cur, tamano_lote):
+    bosquejos = Bosquejos()
+    cur.execute("SELECT * FROM casos")
+    while True:
+        lote = cur.fetchmany(tamano_lote)
+        if not lote:
+            break
+        bosquejos.agregar_lote(lote)
+    bosquejos.guardar(cur)
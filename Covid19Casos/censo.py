@@ -0,0 +1,101 @@
+import collections
+import csv
+import functools
+import os
+import unicodedata
+
+from perfil import perfilado
+
+# Censo 2022. Se lee una sola vez (y otra vez solo si el archivo cambia) y los nombres
+# de provincia se comparan por una clave canónica: sin acentos, sin mayúsculas y con
+# las variantes conocidas unificadas, así "Ciudad Autónoma de Buenos Aires" y "CABA"
+# cruzan con la misma fila del censo.
+RUTA_CENSO = "censo2022.csv"
+
+# Variantes de nombres de provincia → clave canónica
+ALIAS_PROVINCIAS = {
+    "ciudad autonoma de buenos aires": "caba",
+    "ciudad de buenos aires": "caba",
+    "capital federal": "caba",
+    "provincia de buenos aires": "buenos aires",
+    "tierra del fuego, antartida e islas del atlantico sur": "tierra del fuego",
+    "tierra del fuego antartida e islas del atlantico sur": "tierra del fuego",
+}
+
+def clave_provincia(nombre):
+    sin_acentos = unicodedata.normalize("NFKD", nombre).encode("ascii", "ignore").decode("ascii")
+    clave = " ".join(sin_acentos.lower().split())
+    return ALIAS_PROVINCIAS.get(clave, clave)
+
+# Población por (clave de provincia, sexo) y total por provincia
+Censo = collections.namedtuple("Censo", "por_sexo total")
+
+def firma_censo(ruta=RUTA_CENSO):
+    estado = os.stat(ruta)
+    return [estado.st_size, estado.st_mtime_ns]
+
+def leer_censo(ruta=RUTA_CENSO):
+    return leer_censo_archivo(ruta, *firma_censo(ruta))
+
+@functools.lru_cache(maxsize=4)
+def leer_censo_archivo(ruta, tamano, mtime):
+    por_sexo = {}
+    total = {}
+    with open(ruta, encoding="utf-8") as archivo:
+        for fila in csv.DictReader(archivo):
+            provincia = clave_provincia(fila["provincia"])
+            sexo = fila["sexo"].strip().upper()
+            poblacion = int(fila["poblacion"])
+            por_sexo[provincia, sexo] = por_sexo.get((provincia, sexo), 0) + poblacion
+            total[provincia] = total.get(provincia, 0) + poblacion
+    return Censo(por_sexo, total)
+
+# Carga el censo en tablas temporales de la conexión para cruzarlo en SQL:
+# temp.censo con la población y temp.provincias_censo con la clave canónica de
+# cada provincia de la base.
+@perfilado
+def preparar_censo(conn, ruta=RUTA_CENSO):
+    censo = leer_censo(ruta)
+    # Las conexiones de la sesión son query_only; las tablas temporales son propias
+    # de la conexión, así que se permite escribirlas mientras se llenan
+    solo_lectura = conn.execute("PRAGMA query_only").fetchone()[0]
+    conn.execute("PRAGMA query_only = 0")
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS censo (
+            provincia TEXT,
+            sexo TEXT,
+            poblacion INTEGER,
+            PRIMARY KEY (provincia, sexo)
+        )
+    """)
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS provincias_censo (
+            provincia_id INTEGER PRIMARY KEY,
+            provincia TEXT
+        )
+    """)
+    conn.execute("DELETE FROM temp.censo")
+    conn.execute("DELETE FROM temp.provincias_censo")
+    conn.executemany("INSERT INTO temp.censo VALUES (?, ?, ?)",
+                     [(provincia, sexo, poblacion) for (provincia, sexo), poblacion in censo.por_sexo.items()])
+    conn.executemany("INSERT INTO temp.provincias_censo VALUES (?, ?)",
+                     [(id_, clave_provincia(nombre)) for id_, nombre in conn.execute("SELECT id, nombre FROM provincias").fetchall()])
+    # Sin dejar la transacción abierta, que en una conexión del pool bloquearía las cargas
+    conn.commit()
+    conn.execute(f"PRAGMA query_only = {solo_lectura}")
+
+# Lo mismo que las consultas censo_* pero para conteos ya hechos en memoria:
+# {provincia: casos} o {(provincia, sexo): casos} → [(provincia, [sexo,] casos, población)]
+def unir_censo(conteo):
+    censo = leer_censo()
+    grupos = {}
+    for clave, casos in conteo.items():
+        provincia, *sexo = clave if isinstance(clave, tuple) else (clave,)
+        k = (clave_provincia(provincia), *sexo)
+        nombre, suma = grupos.get(k, (provincia, 0))
+        grupos[k] = (min(nombre, provincia), suma + casos)
+    filas = []
+    for (provincia, *sexo), (nombre, casos) in grupos.items():
+        poblacion = censo.por_sexo.get((provincia, *sexo)) if sexo else censo.total.get(provincia)
+        filas.append((nombre, *sexo, casos, poblacion))
+    return filas
@@ -0,0 +1,227 @@
+import array
+import bisect
+import csv
+import itertools
+import mmap
+import os
+import re
+import struct
+import time
+
+# Lector del CSV mapeado en memoria (mmap) con un índice guardado al lado del archivo
+# (<csv>.idx): dónde empieza cada línea y, dentro de cada línea, dónde está cada coma
+# separadora. La primera vez se recorre el archivo para armarlo; después se puede ir
+# directo a cualquier fila o rango de filas y leer solo las columnas que hacen falta,
+# sin volver a separar la línea entera. El índice se rehace si el CSV cambió.
+# El índice guardado también se mapea en memoria en lugar de copiarse, así abrir el
+# CSV es barato y los procesos del modo paralelo comparten esas páginas.
+MAGICO_INDICE = b"CSVIDX2\0"
+CABECERA_INDICE = struct.Struct("<8sQQQH6x")  # mágico, tamaño y mtime del CSV, filas, columnas (alineada a 8 bytes)
+SIN_COLUMNAS = 0xFFFF  # la fila no tiene la cantidad de columnas esperada (o es demasiado larga)
+CAMPO_CSV = re.compile(rb'"(?:[^"]|"")*"|[^,\r\n]*')
+
+# Posiciones de las comas que separan los campos de una línea (sin el fin de línea)
+def separadores_linea(linea):
+    if b'"' not in linea:
+        partes, separador, desplazamiento = linea.split(b","), 1, 0
+    elif (linea.startswith(b'"') and linea.endswith(b'"')
+          and linea.count(b'"') == 2 * (linea.count(b'","') + 1)):
+        # Todos los campos entre comillas y sin comillas adentro: el caso del dataset
+        partes, separador, desplazamiento = linea.split(b'","'), 3, 1
+    else:
+        posiciones = []
+        pos = 0
+        while True:
+            pos = CAMPO_CSV.match(linea, pos).end()
+            if linea[pos:pos + 1] != b",":
+                return posiciones
+            posiciones.append(pos)
+            pos += 1
+    largos = itertools.accumulate(len(parte) for parte in partes[:-1])
+    return [largo + i * separador + desplazamiento for i, largo in enumerate(largos)]
+
+def texto_campo(crudo):
+    if crudo.startswith(b'"'):
+        crudo = crudo[1:-1].replace(b'""', b'"')
+    return crudo.decode("utf-8")
+
+# Con construir=False no arma el índice si falta o está viejo: da ValueError.
+class CSVMapeado:
+    def __init__(self, ruta, construir=True):
+        self.ruta = ruta
+        self.ruta_indice = ruta + ".idx"
+        self.indice = None
+        self.archivo = open(ruta, "rb")
+        self.datos = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        fin_encabezado = self.datos.find(b"\n") + 1 or len(self.datos)
+        self.encabezado = next(csv.reader([self.datos[:fin_encabezado].decode("utf-8")]))
+        self.inicio_datos = fin_encabezado
+        self.columnas = len(self.encabezado)
+
+        estado = os.stat(ruta)
+        self.firma = (estado.st_size, estado.st_mtime_ns)
+        indice = self.leer_indice()
+        if indice is None:
+            if not construir:
+                self.close()
+                raise ValueError(f"El índice {self.ruta_indice} no existe o no corresponde al CSV")
+            indice = self.construir_indice()
+            self.guardar_indice(*indice)
+        self.lineas, self.separadores = indice
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.close()
+
+    def close(self):
+        if self.indice is not None:
+            self.lineas.release()
+            self.separadores.release()
+            self.indice.close()
+            self.indice = None
+        self.datos.close()
+        self.archivo.close()
+
+    def __len__(self):
+        return len(self.lineas) - 1
+
+    def leer_indice(self):
+        try:
+            with open(self.ruta_indice, "rb") as archivo:
+                indice = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError: archivo vacío
+            return None
+        try:
+            magico, tamano, mtime, filas, columnas = CABECERA_INDICE.unpack_from(indice)
+        except struct.error:
+            magico = None
+        if magico != MAGICO_INDICE or (tamano, mtime) != self.firma or columnas != self.columnas:
+            indice.close()
+            return None
+        fin_lineas = CABECERA_INDICE.size + 8 * (filas + 1)
+        if len(indice) != fin_lineas + 2 * filas * (columnas - 1):
+            indice.close()
+            return None
+        self.indice = indice
+        vista = memoryview(indice)
+        return vista[CABECERA_INDICE.size:fin_lineas].cast("Q"), vista[fin_lineas:].cast("H")
+
+    def construir_indice(self):
+        inicio = time.perf_counter()
+        datos = self.datos
+        fin = len(datos)
+        lineas = array.array("Q")
+        separadores = array.array("H")
+        esperados = self.columnas - 1
+        sin_columnas = [SIN_COLUMNAS] * esperados
+
+        pos = self.inicio_datos
+        while pos < fin:
+            siguiente = datos.find(b"\n", pos) + 1 or fin
+            linea = datos[pos:siguiente].rstrip(b"\r\n")
+            posiciones = separadores_linea(linea)
+            lineas.append(pos)
+            if len(posiciones) == esperados and len(linea) < SIN_COLUMNAS:
+                separadores.extend(posiciones)
+            else:
+                separadores.extend(sin_columnas)
+            pos = siguiente
+        lineas.append(fin)
+
+        print(f"✅ Índice de {os.path.basename(self.ruta)} armado: {len(lineas) - 1} filas en {time.perf_counter() - inicio:.2f} s.")
+        return lineas, separadores
+
+    def guardar_indice(self, lineas, separadores):
+        try:
+            with open(self.ruta_indice, "wb") as archivo:
+                archivo.write(CABECERA_INDICE.pack(MAGICO_INDICE, *self.firma, len(lineas) - 1, self.columnas))
+                lineas.tofile(archivo)
+                separadores.tofile(archivo)
+        except OSError as error:
+            print(f"⚠️ No se pudo guardar el índice {self.ruta_indice}: {error}")
+
+    # Número de línea en el archivo (la 1 es el encabezado)
+    def numero_linea(self, i):
+        return i + 2
+
+    def linea(self, i):
+        return self.datos[self.lineas[i]:self.lineas[i + 1]].rstrip(b"\r\n")
+
+    # Campos de la fila i. Si se piden columnas (por posición), solo se cortan esas.
+    # Las filas mal formadas se devuelven completas, como las lee csv, para que el
+    # llamador las pueda rechazar por su largo.
+    def fila(self, i, columnas=None):
+        linea = self.linea(i)
+        base = i * (self.columnas - 1)
+        separadores = self.separadores[base:base + self.columnas - 1]
+        if separadores and separadores[0] == SIN_COLUMNAS:
+            return next(csv.reader([linea.decode("utf-8")]), [])
+        cortes = [-1, *separadores, len(linea)]
+        if columnas is None:
+            columnas = range(self.columnas)
+        return [texto_campo(linea[cortes[c] + 1:cortes[c + 1]]) for c in columnas]
+
+    def filas(self, desde=0, hasta=None, columnas=None):
+        indices = range(*slice(desde, hasta).indices(len(self)))
+        if columnas is not None:
+            columnas = [self.encabezado.index(c) if isinstance(c, str) else c for c in columnas]
+        if columnas is None or columnas == list(range(self.columnas)):
+            yield from self.filas_completas(indices)
+            return
+
+        # Camino rápido para pocas columnas: se corta cada campo directo del mmap
+        datos, lineas, separadores = self.datos, self.lineas, self.separadores
+        ancho = self.columnas - 1
+        for i in indices:
+            base = i * ancho
+            if separadores[base] == SIN_COLUMNAS:
+                yield self.fila(i)
+                continue
+            inicio = lineas[i]
+            campos = []
+            for c in columnas:
+                desde_campo = inicio + separadores[base + c - 1] + 1 if c else inicio
+                if c < ancho:
+                    crudo = datos[desde_campo:inicio + separadores[base + c]]
+                else:
+                    crudo = datos[desde_campo:lineas[i + 1]].rstrip(b"\r\n")
+                campos.append(texto_campo(crudo))
+            yield campos
+
+    # Filas enteras: cortar campo por campo es lento, así que se decodifica la línea una
+    # vez y, si no tiene comillas o tiene el formato del dataset (todos los campos entre
+    # comillas y sin comillas adentro), alcanza con un split. El resto va por fila().
+    def filas_completas(self, indices):
+        datos, lineas, separadores = self.datos, self.lineas, self.separadores
+        ancho = self.columnas - 1
+        for i in indices:
+            if separadores[i * ancho] == SIN_COLUMNAS:
+                yield self.fila(i)
+                continue
+            texto = datos[lineas[i]:lineas[i + 1]].decode("utf-8").rstrip("\r\n")
+            if '"' not in texto:
+                yield texto.split(",")
+            elif texto[0] == texto[-1] == '"' and texto.count('"') == 2 * (texto.count('","') + 1) == 2 * self.columnas:
+                yield texto[1:-1].split('","')
+            else:
+                yield self.fila(i)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self.filas(i.start, i.stop))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.fila(i)
+
+    # Rangos de filas [desde, hasta) que ocupan unos tamano_rango bytes del archivo
+    # cada uno, sacados del índice sin leer el archivo.
+    def rangos(self, tamano_rango):
+        cortes = [0]
+        while cortes[-1] < len(self):
+            inicio = self.lineas[cortes[-1]]
+            cortes.append(min(bisect.bisect_left(self.lineas, inicio + tamano_rango), len(self)))
+        return list(zip(cortes, cortes[1:]))
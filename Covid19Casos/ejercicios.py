@@ -1,104 +1,1322 @@
 
+import collections
+import contextlib
 import csv
+import datetime
+import functools
+import gzip
+import io
+import itertools
+import json
+import operator
+import os
+import pathlib
+import queue
+import re
 import sqlite3
+import sys
+import threading
+import time
+import uuid
+
+from almacen_parquet import RUTA_PARQUET, DatasetParquet, escribir_parquet, importar_pyarrow
+from bosquejos import HyperLogLog, leer_bosquejos, leer_muestra, reconstruir_bosquejos
+from censo import RUTA_CENSO, firma_censo, preparar_censo, unir_censo
+from csv_mapeado import CSVMapeado
+from esquema import COLUMNAS_CASOS, COLUMNAS_CODIFICADAS, VARIABLES, es_confirmado
+from intervalos import calcular_cuartiles, contar_outliers, contar_por_intervalo
+from perfil import (RUTA_PERFIL, activar_perfil, conectar, ejecutar_sql, en_paralelo, exportar_perfil,
+                    perfilado, registrar_consultas)
+from series import VENTANAS_MOVILES, armar_series, detectar_picos, media_movil, tasa_crecimiento
 
 # Ruta al archivo CSV
 RUTA_CSV = "C:/Users/Usuario/OneDrive/Escritorio/Covid19-Argentina-EDA/Covid19Casos/Covid19Casos.csv"
 
+# Base de datos donde se cargan los casos
+RUTA_DB = "covid.db"
+
+# Versión del esquema de covid.db (se guarda en PRAGMA user_version).
+# Versión 2: edad entera o NULL, fallecido/ARM como 0/1, fecha ISO y las columnas
+# categóricas como ids enteros que apuntan a tablas chicas de valores.
+# Versión 3: tabla metadatos con el número de carga y los datos del CSV cargado.
+# Versión 4: tabla cubo con la cantidad de casos por provincia, sexo, clasificación,
+# edad y fallecido, de donde salen los reportes.
+# Versión 5: tabla cubo_departamentos para los reportes por departamento.
+# Versión 6: tablas muestra, estratos y bosquejos para el modo aproximado.
+# Versión 7: tabla calidad con el perfil de calidad de cada variable, que arma la
+# carga y leen los puntos 1 y 2. Compara el texto del CSV con el valor guardado, así
+# que no se puede sacar de casos: una base anterior no se migra. Las cargas la
+# rechazan y piden "Crear tabla SQL", que borra y vuelve a crear todas las tablas
+# (calidad incluida); después hay que volver a cargar el CSV.
+VERSION_ESQUEMA = 7
+
 # Crear base de datos y tabla
 def crear_tabla():
-    conn = sqlite3.connect("covid.db")
+    conn = conectar(RUTA_DB)
     cur = conn.cursor()
-    cur.execute("DROP TABLE IF EXISTS casos")
+    for tabla in ["calidad", "bosquejos", "estratos", "muestra", "cubo", "cubo_departamentos", "casos", "departamentos", "provincias",
+                  "sexos", "clasificaciones", "metadatos"]:
+        cur.execute(f"DROP TABLE IF EXISTS {tabla}")
+    cur.execute("""
+        CREATE TABLE metadatos (
+            clave TEXT PRIMARY KEY,
+            valor TEXT
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE provincias (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE departamentos (
+            id INTEGER PRIMARY KEY,
+            provincia_id INTEGER REFERENCES provincias(id),
+            nombre TEXT NOT NULL,
+            UNIQUE (provincia_id, nombre)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE sexos (
+            id INTEGER PRIMARY KEY,
+            codigo TEXT NOT NULL UNIQUE
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE clasificaciones (
+            id INTEGER PRIMARY KEY,
+            nombre TEXT NOT NULL UNIQUE,
+            confirmado INTEGER NOT NULL
+        )
+    """)
     cur.execute("""
         CREATE TABLE casos (
-            sexo TEXT,
+            sexo_id INTEGER REFERENCES sexos(id),
             edad INTEGER,
             edad_años_meses TEXT,
             residencia_pais_nombre TEXT,
-            residencia_provincia_nombre TEXT,
-            residencia_departamento_nombre TEXT,
-            carga_provincia_nombre TEXT,
-            fallecido TEXT,
-            asistencia_respiratoria_mecanica TEXT,
+            residencia_provincia_id INTEGER REFERENCES provincias(id),
+            residencia_departamento_id INTEGER REFERENCES departamentos(id),
+            carga_provincia_id INTEGER REFERENCES provincias(id),
+            fallecido INTEGER,
+            asistencia_respiratoria_mecanica INTEGER,
             origen_financiamiento TEXT,
-            clasificacion TEXT,
+            clasificacion_id INTEGER REFERENCES clasificaciones(id),
             fecha_diagnostico TEXT
         )
     """)
+    cur.execute("""
+        CREATE TABLE cubo (
+            residencia_provincia_id INTEGER,
+            sexo_id INTEGER,
+            clasificacion_id INTEGER,
+            edad INTEGER,
+            fallecido INTEGER,
+            cantidad INTEGER NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE cubo_departamentos (
+            residencia_departamento_id INTEGER,
+            clasificacion_id INTEGER,
+            fallecido INTEGER,
+            asistencia_respiratoria_mecanica INTEGER,
+            cantidad INTEGER NOT NULL
+        )
+    """)
+    # Muestra estratificada: las mismas columnas que casos
+    cur.execute("CREATE TABLE muestra AS SELECT * FROM casos WHERE 0")
+    cur.execute("""
+        CREATE TABLE estratos (
+            provincia_id INTEGER,
+            sexo_id INTEGER,
+            poblacion INTEGER NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE bosquejos (
+            variable TEXT,
+            tipo TEXT,
+            parametros TEXT,
+            datos BLOB,
+            PRIMARY KEY (variable, tipo)
+        )
+    """)
+    # Perfil de calidad de los datos cargados: una fila por variable. Mínimo y
+    # máximo no tienen tipo para guardar números o textos según la variable; las
+    # frecuencias y variantes son listas JSON [[valor, cantidad], ...].
+    cur.execute("""
+        CREATE TABLE calidad (
+            variable TEXT PRIMARY KEY,
+            filas INTEGER,
+            nulos INTEGER,
+            vacios INTEGER,
+            con_espacios INTEGER,
+            invalidos INTEGER,
+            distintos INTEGER,
+            truncado INTEGER,
+            minimo,
+            maximo,
+            frecuencias TEXT,
+            variantes TEXT
+        )
+    """)
+    cur.execute(f"PRAGMA user_version = {VERSION_ESQUEMA}")
     conn.commit()
+    # Modo WAL (queda guardado en el archivo): los lectores de la sesión no bloquean
+    # a las cargas ni entre ellos, y siguen leyendo mientras se escribe
+    cur.execute("PRAGMA journal_mode = WAL")
     conn.close()
     print("✅ Tabla creada correctamente.")
 
-# Cargar datos desde CSV
-def cargar_datos():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
-    with open(RUTA_CSV, encoding="utf-8") as archivo:
+# Normalización de valores: se hace una sola vez al cargar, así las consultas no
+# tienen que repetir CAST, TRIM y UPPER en cada fila.
+SI_NO = {"SI": 1, "NO": 0}
+
+def normalizar_edad(texto):
+    try:
+        return int(texto)
+    except ValueError:
+        return None
+
+@functools.lru_cache(maxsize=None)
+def normalizar_fecha(texto):
+    if not texto:
+        return None
+    try:
+        return datetime.date.fromisoformat(texto[:10]).isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.strptime(texto, "%d/%m/%Y").date().isoformat()
+    except ValueError:
+        return None
+
+def normalizar_fila(fila):
+    (sexo, edad, edad_años_meses, pais, provincia, departamento, carga_provincia,
+     fallecido, arm, origen, clasificacion, fecha) = [valor.strip() for valor in fila]
+    return (
+        sexo.upper() or None,
+        normalizar_edad(edad),
+        edad_años_meses or None,
+        pais or None,
+        provincia or None,
+        departamento or None,
+        carga_provincia or None,
+        SI_NO.get(fallecido.upper()),
+        SI_NO.get(arm.upper()),
+        origen or None,
+        clasificacion or None,
+        normalizar_fecha(fecha),
+    )
+
+# Normaliza un solo campo con las mismas reglas que normalizar_fila (el resto de la
+# fila va vacío, que en todas las columnas se puede normalizar)
+def normalizar_valor(posicion, texto):
+    fila = [""] * 12
+    fila[posicion] = texto
+    return normalizar_fila(fila)[posicion]
+
+# Ids ya asignados en la base, para no consultar las tablas de valores por cada fila
+def leer_codigos(cur):
+    return {
+        "provincias": dict(cur.execute("SELECT nombre, id FROM provincias")),
+        "departamentos": {(provincia_id, nombre): id_ for id_, provincia_id, nombre
+                          in cur.execute("SELECT id, provincia_id, nombre FROM departamentos")},
+        "sexos": dict(cur.execute("SELECT codigo, id FROM sexos")),
+        "clasificaciones": dict(cur.execute("SELECT nombre, id FROM clasificaciones")),
+    }
+
+def obtener_id(cur, codigos, tabla, clave):
+    if clave is None:
+        return None
+    id_ = codigos[tabla].get(clave)
+    if id_ is None:
+        if tabla == "provincias":
+            cur.execute("INSERT INTO provincias (nombre) VALUES (?)", (clave,))
+        elif tabla == "departamentos":
+            cur.execute("INSERT INTO departamentos (provincia_id, nombre) VALUES (?, ?)", clave)
+        elif tabla == "sexos":
+            cur.execute("INSERT INTO sexos (codigo) VALUES (?)", (clave,))
+        else:
+            confirmado = int(es_confirmado(clave))
+            cur.execute("INSERT INTO clasificaciones (nombre, confirmado) VALUES (?, ?)", (clave, confirmado))
+        id_ = codigos[tabla][clave] = cur.lastrowid
+    return id_
+
+# Reemplaza los textos categóricos de una fila normalizada por sus ids
+def codificar_fila(cur, codigos, fila):
+    (sexo, edad, edad_años_meses, pais, provincia, departamento, carga_provincia,
+     fallecido, arm, origen, clasificacion, fecha) = fila
+    provincia_id = obtener_id(cur, codigos, "provincias", provincia)
+    return (
+        obtener_id(cur, codigos, "sexos", sexo),
+        edad,
+        edad_años_meses,
+        pais,
+        provincia_id,
+        obtener_id(cur, codigos, "departamentos", departamento and (provincia_id, departamento)),
+        obtener_id(cur, codigos, "provincias", carga_provincia),
+        fallecido,
+        arm,
+        origen,
+        obtener_id(cur, codigos, "clasificaciones", clasificacion),
+        fecha,
+    )
+
+# Índices secundarios para las consultas de los reportes. Se borran antes de la
+# carga masiva y se crean al final: insertar con los índices armados es más lento.
+INDICES = {
+    "idx_casos_clasificacion_provincia_sexo": "casos (clasificacion_id, residencia_provincia_id, sexo_id)",
+    "idx_casos_fallecido_sexo_edad": "casos (fallecido, sexo_id, edad)",
+    "idx_casos_fecha": "casos (fecha_diagnostico)",
+    "idx_cubo": "cubo (residencia_provincia_id, sexo_id, clasificacion_id, edad, fallecido)",
+    "idx_cubo_departamentos": "cubo_departamentos (residencia_departamento_id, clasificacion_id, fallecido, asistencia_respiratoria_mecanica)",
+}
+
+def borrar_indices(cur):
+    for nombre in INDICES:
+        cur.execute(f"DROP INDEX IF EXISTS {nombre}")
+
+def crear_indices(cur):
+    for nombre, definicion in INDICES.items():
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {nombre} ON {definicion}")
+    # Estadísticas para que el planificador elija bien (y pueda usar skip-scan)
+    cur.execute("ANALYZE")
+
+# Parámetros de la carga masiva
+TAMANO_LOTE = 50000
+TAMANO_RANGO = 16 * 1024 * 1024  # bytes del CSV que procesa cada tarea en modo paralelo
+RUTA_RECHAZOS = "rechazos.csv"
+
+# Pragmas que se aplican solo mientras dura la carga (después se restauran).
+# El journal queda en WAL: salir de WAL necesita que no haya otras conexiones
+# abiertas, y la sesión de lectura puede tener varias.
+PRAGMAS_CARGA = {
+    "synchronous": "OFF",
+    "cache_size": -262144,  # negativo = KiB, o sea 256 MB
+}
+
+def aplicar_pragmas(cur, pragmas):
+    anteriores = {}
+    for nombre, valor in pragmas.items():
+        anteriores[nombre] = cur.execute(f"PRAGMA {nombre}").fetchone()[0]
+        cur.execute(f"PRAGMA {nombre} = {valor}")
+    return anteriores
+
+# Perfil de calidad de los datos, armado durante la carga con las mismas filas que
+# se leen (sin otra pasada por el CSV ni por la tabla). Por cada variable compara el
+# texto tal como viene en el archivo con el valor normalizado que se guarda, así que
+# registra lo que la normalización tapa: vacíos, espacios de más, otras formas de
+# escribir el mismo valor (" f" → "F", "31/12/2020" → "2020-12-31") y los textos que
+# no se pudieron leer (edades y fechas que quedan NULL). También guarda cuántas veces
+# aparece cada valor normalizado, en el orden del archivo, y el mínimo y el máximo.
+# Los perfiles parciales se suman: el modo paralelo arma uno por rango y los junta, y
+# una carga completa suma el suyo al guardado, igual que agrega sus filas a casos.
+MAXIMO_FRECUENCIAS = 10000  # valores distintos que se guardan por variable
+MAXIMO_VARIANTES = 1000
+
+class CalidadDatos:
+    def __init__(self):
+        self.filas = 0
+        self.rechazadas = 0
+        self.columnas = {
+            var: {"nulos": 0, "vacios": 0, "con_espacios": 0, "invalidos": 0, "minimo": None, "maximo": None,
+                  "frecuencias": collections.Counter(), "variantes": collections.Counter(), "truncado": False}
+            for var, _, _ in VARIABLES
+        }
+
+    # Filas del CSV con 12 columnas, tal como vienen. Cada texto distinto de una
+    # columna se normaliza y se revisa una sola vez por lote, con su cantidad.
+    def agregar_lote(self, crudas, rechazadas=0):
+        self.filas += len(crudas)
+        self.rechazadas += rechazadas
+        if not crudas:
+            return
+        for posicion, (var, _, clasificacion) in enumerate(VARIABLES):
+            columna = self.columnas[var]
+            # Se cuenta la columna directo de las filas: transponer el lote con
+            # zip(*crudas) costaba más que contar
+            textos = map(operator.itemgetter(posicion), crudas)
+            for texto, cantidad in collections.Counter(textos).items():
+                valor = normalizar_valor(posicion, texto)
+                limpio = texto.strip()
+                if not limpio:
+                    columna["vacios"] += cantidad
+                elif limpio != texto:
+                    columna["con_espacios"] += cantidad
+                if valor is None:
+                    columna["nulos"] += cantidad
+                    if limpio:
+                        columna["invalidos"] += cantidad
+                    continue
+                if texto != texto_valor(valor, None, clasificacion):
+                    columna["variantes"][texto] += cantidad
+                columna["frecuencias"][valor] += cantidad
+                self.limites(columna, valor, valor)
+            self.recortar(columna)
+
+    def combinar(self, otro):
+        self.filas += otro.filas
+        self.rechazadas += otro.rechazadas
+        for var, columna in self.columnas.items():
+            suya = otro.columnas[var]
+            for clave in ("nulos", "vacios", "con_espacios", "invalidos"):
+                columna[clave] += suya[clave]
+            columna["frecuencias"].update(suya["frecuencias"])
+            columna["variantes"].update(suya["variantes"])
+            columna["truncado"] = columna["truncado"] or suya["truncado"]
+            if suya["minimo"] is not None:
+                self.limites(columna, suya["minimo"], suya["maximo"])
+            self.recortar(columna)
+
+    @staticmethod
+    def limites(columna, minimo, maximo):
+        if columna["minimo"] is None or minimo < columna["minimo"]:
+            columna["minimo"] = minimo
+        if columna["maximo"] is None or maximo > columna["maximo"]:
+            columna["maximo"] = maximo
+
+    # Si una variable tiene demasiados valores distintos se quedan los más frecuentes
+    # (y la cantidad de distintos pasa a ser un mínimo)
+    @staticmethod
+    def recortar(columna):
+        if len(columna["frecuencias"]) > MAXIMO_FRECUENCIAS:
+            columna["frecuencias"] = collections.Counter(dict(columna["frecuencias"].most_common(MAXIMO_FRECUENCIAS)))
+            columna["truncado"] = True
+        if len(columna["variantes"]) > MAXIMO_VARIANTES:
+            columna["variantes"] = collections.Counter(dict(columna["variantes"].most_common(MAXIMO_VARIANTES)))
+
+    def guardar(self, cur):
+        cur.execute("DELETE FROM calidad")
+        for var, columna in self.columnas.items():
+            frecuencias = list(columna["frecuencias"].items())
+            cur.execute("INSERT INTO calidad VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+                var, self.filas, columna["nulos"], columna["vacios"], columna["con_espacios"], columna["invalidos"],
+                len(frecuencias), int(columna["truncado"]), columna["minimo"], columna["maximo"],
+                json.dumps(frecuencias, ensure_ascii=False),
+                json.dumps(columna["variantes"].most_common(), ensure_ascii=False)))
+        cur.execute("INSERT OR REPLACE INTO metadatos (clave, valor) VALUES ('filas_rechazadas', ?)", (str(self.rechazadas),))
+
+# Perfil guardado en la base, para sumarle el de una carga que agrega filas
+def leer_calidad(cur):
+    calidad = CalidadDatos()
+    cur.execute("""
+        SELECT variable, filas, nulos, vacios, con_espacios, invalidos, truncado, minimo, maximo, frecuencias, variantes
+        FROM calidad
+    """)
+    for var, filas, nulos, vacios, con_espacios, invalidos, truncado, minimo, maximo, frecuencias, variantes in cur.fetchall():
+        calidad.filas = filas
+        calidad.columnas[var].update(
+            nulos=nulos, vacios=vacios, con_espacios=con_espacios, invalidos=invalidos, truncado=bool(truncado),
+            minimo=minimo, maximo=maximo, frecuencias=collections.Counter(dict(json.loads(frecuencias))),
+            variantes=collections.Counter(dict(json.loads(variantes))))
+    fila = cur.execute("SELECT valor FROM metadatos WHERE clave = 'filas_rechazadas'").fetchone()
+    calidad.rechazadas = int(fila[0]) if fila else 0
+    return calidad
+
+# Agrupa las filas válidas en lotes y manda las que no tienen 12 columnas a rechazos.
+# Devuelve cada lote junto con la cantidad de filas rechazadas mientras se armaba.
+# Si recibe un perfil de calidad, le pasa cada lote con sus filas tal como venían.
+def leer_lotes(lector, tamano_lote, rechazos, calidad=None):
+    lote = []
+    crudas = []
+    rechazadas = 0
+    for fila in lector:
+        if len(fila) != 12:
+            rechazos.writerow([lector.line_num] + fila)
+            rechazadas += 1
+            continue
+        lote.append(normalizar_fila(fila))
+        if calidad is not None:
+            crudas.append(fila)
+        if len(lote) == tamano_lote:
+            if calidad is not None:
+                calidad.agregar_lote(crudas, rechazadas)
+                crudas = []
+            yield lote, rechazadas
+            lote = []
+            rechazadas = 0
+    if lote or rechazadas:
+        if calidad is not None:
+            calidad.agregar_lote(crudas, rechazadas)
+        yield lote, rechazadas
+
+# Abre el CSV como texto; si termina en .gz lo descomprime mientras lo lee
+def abrir_csv(ruta):
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, "rt", encoding="utf-8", newline="")
+    return open(ruta, encoding="utf-8", newline="")
+
+# Modo serie: un solo proceso lee, parsea y escribe
+def leer_lotes_csv(ruta, tamano_lote, rechazos, calidad=None):
+    with abrir_csv(ruta) as archivo:
         lector = csv.reader(archivo)
         encabezado = next(lector)
-        for fila in lector:
-            if len(fila) == 12:
-                cur.execute("INSERT INTO casos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", fila)
-    conn.commit()
-    conn.close()
-    print("✅ Datos cargados correctamente.")
-
+        rechazos.writerow(["linea"] + encabezado)
+        yield from leer_lotes(lector, tamano_lote, rechazos, calidad)
+
+# Divide el archivo (sin el encabezado) en rangos para que cada proceso pueda parsear
+# su parte por separado. Devuelve si los rangos son de filas (el CSV tiene un índice
+# vigente y cada proceso lee su parte con CSVMapeado) o de bytes que empiezan y
+# terminan en un fin de línea. Un índice viejo no se rehace: armarlo cuesta más que
+# buscar los fines de línea.
+def dividir_en_rangos(ruta, tamano_rango=TAMANO_RANGO):
+    if os.path.exists(ruta + ".idx"):
+        try:
+            with CSVMapeado(ruta, construir=False) as csv_mapeado:
+                return True, csv_mapeado.rangos(tamano_rango)
+        except ValueError:
+            pass
+    tamano = os.path.getsize(ruta)
+    with open(ruta, "rb") as archivo:
+        archivo.readline()
+        cortes = [archivo.tell()]
+        while cortes[-1] < tamano:
+            archivo.seek(min(cortes[-1] + tamano_rango, tamano) - 1)
+            archivo.readline()
+            cortes.append(archivo.tell())
+    return False, list(zip(cortes, cortes[1:]))
+
+# Tarea de cada proceso del pool: parsea y normaliza un rango y devuelve las filas
+# listas para codificar, las rechazadas (con su número de línea dentro del rango), cuántas
+# líneas ocupó el rango, para que el escritor pueda numerar los rechazos, y el perfil
+# de calidad del rango. Con por_filas, desde y hasta son filas del índice del CSV.
+def parsear_rango(ruta, desde, hasta, por_filas=False):
+    if por_filas:
+        with CSVMapeado(ruta, construir=False) as csv_mapeado:
+            filas = csv_mapeado.filas(desde, hasta, columnas=range(csv_mapeado.columnas))
+            return normalizar_rango(enumerate(filas, 1), hasta - desde)
+    with open(ruta, "rb") as archivo:
+        archivo.seek(desde)
+        datos = archivo.read(hasta - desde)
+    lector = csv.reader(io.StringIO(datos.decode("utf-8"), newline=""))
+    return normalizar_rango(((lector.line_num, fila) for fila in lector), datos.count(b"\n"))
+
+# Normaliza las filas (numeradas por línea) de un rango; ver parsear_rango
+def normalizar_rango(numeradas, lineas):
+    filas = []
+    crudas = []
+    rechazos = []
+    # Los valores se repiten muchísimo (provincias, sexo, clasificación...). Usar
+    # siempre el mismo objeto hace que pickle los mande una sola vez al escritor.
+    valores = {}
+    for numero, fila in numeradas:
+        if len(fila) == 12:
+            filas.append(tuple([valores.setdefault(v, v) for v in normalizar_fila(fila)]))
+            crudas.append(fila)
+        else:
+            rechazos.append([numero] + fila)
+    calidad = CalidadDatos()
+    calidad.agregar_lote(crudas, len(rechazos))
+    return filas, rechazos, lineas, calidad
+
+# Modo paralelo: un pool de procesos parsea los rangos y este proceso es el único
+# que escribe en la base. Los resultados se consumen en el orden del archivo, así
+# que las filas quedan insertadas exactamente igual que en el modo serie.
+def leer_lotes_paralelo(ruta, procesos, rechazos, tamano_rango=None, calidad=None):
+    import multiprocessing
+    from collections import deque
+
+    tamano_rango = tamano_rango or rango_para(procesos)
+
+    with open(ruta, encoding="utf-8", newline="") as archivo:
+        encabezado = next(csv.reader(archivo))
+    rechazos.writerow(["linea"] + encabezado)
+
+    linea_base = 1  # el encabezado ocupa la línea 1
+    with multiprocessing.Pool(procesos) as pool:
+        pendientes = deque()
+        por_filas, rangos = dividir_en_rangos(ruta, tamano_rango)
+        rangos = iter(rangos)
+        while True:
+            # Como mucho dos rangos por proceso en vuelo, para no llenar la memoria
+            for desde, hasta in rangos:
+                pendientes.append(pool.apply_async(parsear_rango, (ruta, desde, hasta, por_filas)))
+                if len(pendientes) >= 2 * procesos:
+                    break
+            if not pendientes:
+                break
+            filas, rechazadas, lineas, calidad_rango = pendientes.popleft().get()
+            if calidad is not None:
+                calidad.combinar(calidad_rango)
+            for fila in rechazadas:
+                rechazos.writerow([linea_base + fila[0]] + fila[1:])
+            linea_base += lineas
+            yield filas, len(rechazadas)
+
+# Arma (o revisa) el índice del CSV de casos para leerlo con CSVMapeado
+def indexar_csv(ruta=None):
+    ruta = ruta or RUTA_CSV
+    with CSVMapeado(ruta) as csv_mapeado:
+        tamano = os.path.getsize(csv_mapeado.ruta_indice) / 1024 / 1024
+        print(f"✅ {os.path.basename(ruta)}: {len(csv_mapeado)} filas, índice de {tamano:.1f} MB en {csv_mapeado.ruta_indice}.")
+        if len(csv_mapeado):
+            print(f"   Primera fila: {csv_mapeado[0]}")
+            print(f"   Última fila:  {csv_mapeado[-1]}")
+
+# Cubos de conteos: una fila por combinación de valores con la cantidad de casos.
+# Son unos miles de filas en lugar de millones y alcanzan para los reportes.
+# - cubo: provincia, sexo, clasificación, edad y fallecido (la edad se guarda exacta,
+#   no por intervalo, porque los cuartiles y los intervalos de Sturges dependen de los datos).
+# - cubo_departamentos: departamento (su id ya identifica el par provincia-departamento),
+#   clasificación, fallecido y asistencia respiratoria, para los reportes por departamento.
+CUBOS = {
+    "cubo": ("residencia_provincia_id", "sexo_id", "clasificacion_id", "edad", "fallecido"),
+    "cubo_departamentos": ("residencia_departamento_id", "clasificacion_id", "fallecido", "asistencia_respiratoria_mecanica"),
+}
+COLUMNAS_CUBO = CUBOS["cubo"]
+
+@perfilado
+def reconstruir_cubos(cur):
+    for tabla, columnas in CUBOS.items():
+        columnas = ", ".join(columnas)
+        cur.execute(f"DELETE FROM {tabla}")
+        cur.execute(f"INSERT INTO {tabla} SELECT {columnas}, COUNT(*) FROM casos GROUP BY {columnas}")
+
+# Valores de las columnas de un cubo en una fila codificada de casos
+def clave_cubo(fila, columnas):
+    return tuple(fila[COLUMNAS_CASOS.index(columna)] for columna in columnas)
+
+# Cambios que produce una fila insertada (signo 1) o borrada (signo -1) en cada cubo
+def contar_cambios_cubos(cambios, fila, signo=1):
+    for tabla, columnas in CUBOS.items():
+        cambios[tabla][clave_cubo(fila, columnas)] += signo
+
+# Suma a los cubos los cambios de una carga incremental ({tabla: {clave: +n o -n}})
+@perfilado
+def actualizar_cubos(cur, cambios):
+    for tabla, columnas in CUBOS.items():
+        condicion = " AND ".join(f"{columna} IS ?" for columna in columnas)
+        marcadores = ", ".join("?" * (len(columnas) + 1))
+        for clave, cantidad in cambios[tabla].items():
+            if cantidad == 0:
+                continue
+            cur.execute(f"UPDATE {tabla} SET cantidad = cantidad + ? WHERE {condicion}", (cantidad, *clave))
+            if cur.rowcount == 0:
+                cur.execute(f"INSERT INTO {tabla} VALUES ({marcadores})", (*clave, cantidad))
+        cur.execute(f"DELETE FROM {tabla} WHERE cantidad = 0")
+
+# Anota en metadatos qué se cargó. Cada carga aumenta "generacion" y recibe un id al
+# azar ("carga"), lo que cambia la huella de los datos e invalida los resultados
+# guardados en la caché; el id hace falta porque "Crear tabla" vuelve la generación a
+# cero y una carga nueva del mismo CSV repetiría la huella anterior.
+# También guarda la fecha de diagnóstico más reciente, que es el punto de partida
+# de la próxima carga incremental.
+def registrar_carga(cur, filas_nuevas):
+    metadatos = dict(cur.execute("SELECT clave, valor FROM metadatos"))
+    estado = os.stat(RUTA_CSV)
+    valores = {
+        "generacion": int(metadatos.get("generacion", 0)) + 1,
+        "carga": uuid.uuid4().hex,
+        "filas": int(metadatos.get("filas", 0)) + filas_nuevas,
+        "csv_mtime": estado.st_mtime_ns,
+        "csv_tamano": estado.st_size,
+        "fecha_maxima": cur.execute("SELECT MAX(fecha_diagnostico) FROM casos").fetchone()[0] or "",
+    }
+    cur.executemany("INSERT OR REPLACE INTO metadatos (clave, valor) VALUES (?, ?)",
+                    [(clave, str(valor)) for clave, valor in valores.items()])
+
+# Cargar datos desde CSV (procesos > 1 activa el modo paralelo)
+@perfilado
+def cargar_datos(tamano_lote=None, ruta_rechazos=RUTA_RECHAZOS, procesos=1):
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    conn = conectar(RUTA_DB)
+    cur = conn.cursor()
+    if cur.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+        conn.close()
+        print("❌ La base no tiene el esquema actual. Ejecute primero 'Crear tabla SQL'.")
+        return
+    # Cada proceso salta a su rango de bytes del archivo, y en un .gz eso no se puede
+    if procesos > 1 and RUTA_CSV.endswith(".gz"):
+        print("⚠️ El modo paralelo necesita el CSV sin comprimir; se carga con un solo proceso.")
+        procesos = 1
+    codigos = leer_codigos(cur)
+    anteriores = aplicar_pragmas(cur, PRAGMAS_CARGA)
+    inicio = time.perf_counter()
+    total = 0
+    rechazadas = 0
+    try:
+        with open(ruta_rechazos, "w", encoding="utf-8", newline="") as archivo_rechazos:
+            rechazos = csv.writer(archivo_rechazos)
+            calidad = leer_calidad(cur)
+            if procesos > 1:
+                lotes = leer_lotes_paralelo(RUTA_CSV, procesos, rechazos, calidad=calidad)
+            else:
+                lotes = leer_lotes_csv(RUTA_CSV, tamano_lote, rechazos, calidad)
+            # Toda la carga va en una sola transacción: si algo falla no queda a medias.
+            # El BEGIN explícito hace falta porque sqlite3 no abre la transacción antes
+            # de un DROP INDEX, y sin él el rollback no devolvería los índices.
+            cur.execute("BEGIN")
+            borrar_indices(cur)
+            # Los casos se agregan a los que ya había: los bosquejos también
+            bosquejos = leer_bosquejos(cur)
+            for lote, rechazadas_lote in lotes:
+                lote = [codificar_fila(cur, codigos, fila) for fila in lote]
+                cur.executemany("INSERT INTO casos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", lote)
+                bosquejos.agregar_lote(lote)
+                total += len(lote)
+                rechazadas += rechazadas_lote
+            reconstruir_cubos(cur)
+            bosquejos.guardar(cur)
+            calidad.guardar(cur)
+            crear_indices(cur)
+            registrar_carga(cur, total)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        aplicar_pragmas(cur, anteriores)
+        conn.close()
 
-# Punto 1 - Descripción de variables
-def punto1_describir_variables():
-    conn = sqlite3.connect("covid.db")
+    segundos = time.perf_counter() - inicio
+    print(f"✅ Datos cargados correctamente: {total} filas en {segundos:.2f} s ({total / max(segundos, 1e-9):.0f} filas/s).")
+    if rechazadas:
+        print(f"⚠️ {rechazadas} filas sin 12 columnas guardadas en {ruta_rechazos}.")
+
+
+# Carga incremental: para las actualizaciones diarias del CSV. Las filas con fecha de
+# diagnóstico anterior a (fecha máxima ya cargada - ventana) se consideran cerradas y
+# no se tocan. Las de la ventana, y las que no tienen fecha, se comparan por contenido
+# con las que ya están en la base: se insertan las nuevas, se borran las que ya no
+# vienen en el archivo y las iguales quedan como están (una fila modificada es una
+# borrada más una nueva). Las escrituras son proporcionales a lo que cambió, no a
+# todo el histórico. Los cambios en filas más viejas que la ventana requieren una
+# carga completa; para detectarlos se compara, por fecha, cuántas filas cerradas trae
+# el archivo con cuántas hay en la base (así también se ve una corrección que movió
+# la fecha de una fila de la ventana a antes del corte, que si no se perdería).
+VENTANA_INCREMENTAL_DIAS = 14
+
+@perfilado
+def cargar_incremental(ventana_dias=VENTANA_INCREMENTAL_DIAS, tamano_lote=None, ruta_rechazos=RUTA_RECHAZOS):
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    conn = conectar(RUTA_DB)
     cur = conn.cursor()
-    print("\n📊 Punto 1: Descripción de las variables\n")
-
-    variables = [
-        ("sexo", "Cualitativa", "Nominal"),
-        ("edad", "Cuantitativa", "Discreta"),
-        ("edad_años_meses", "Cualitativa", "Nominal"),
-        ("residencia_pais_nombre", "Cualitativa", "Nominal"),
-        ("residencia_provincia_nombre", "Cualitativa", "Nominal"),
-        ("residencia_departamento_nombre", "Cualitativa", "Nominal"),
-        ("carga_provincia_nombre", "Cualitativa", "Nominal"),
-        ("fallecido", "Cualitativa", "Binaria"),
-        ("asistencia_respiratoria_mecanica", "Cualitativa", "Binaria"),
-        ("origen_financiamiento", "Cualitativa", "Nominal"),
-        ("clasificacion", "Cualitativa", "Nominal"),
-        ("fecha_diagnostico", "Cualitativa", "Ordinal")
-    ]
+    if cur.execute("PRAGMA user_version").fetchone()[0] != VERSION_ESQUEMA:
+        conn.close()
+        print("❌ La base no tiene el esquema actual. Ejecute primero 'Crear tabla SQL'.")
+        return
+    fecha_maxima = dict(cur.execute("SELECT clave, valor FROM metadatos")).get("fecha_maxima")
+    if not fecha_maxima:
+        conn.close()
+        print("❌ No hay una carga previa con fechas. Use primero 'Cargar datos desde CSV'.")
+        return
+    corte = (datetime.date.fromisoformat(fecha_maxima) - datetime.timedelta(days=ventana_dias)).isoformat()
+
+    codigos = leer_codigos(cur)
+    anteriores = aplicar_pragmas(cur, PRAGMAS_CARGA)
+    inicio = time.perf_counter()
+    insertadas = 0
+    borradas = 0
+    iguales = 0
+    rechazadas = 0
+    cerradas = collections.Counter()  # filas del archivo anteriores al corte, por fecha
+    cambios_cubos = {tabla: collections.Counter() for tabla in CUBOS}
+    columnas = ", ".join(COLUMNAS_CASOS)
+    marcadores = ", ".join("?" * len(COLUMNAS_CASOS))
+    try:
+        # Las filas de la ventana que trae el archivo van a una tabla temporal y no a
+        # la memoria de Python (con presupuesto, SQLite la pasa a disco)
+        cur.execute(f"CREATE TEMP TABLE ventana AS SELECT {columnas} FROM casos WHERE 0")
+        with open(ruta_rechazos, "w", encoding="utf-8", newline="") as archivo_rechazos:
+            rechazos = csv.writer(archivo_rechazos)
+            # El perfil describe el archivo completo, también las filas que no se tocan
+            calidad = CalidadDatos()
+            for lote, rechazadas_lote in leer_lotes_csv(RUTA_CSV, tamano_lote, rechazos, calidad):
+                rechazadas += rechazadas_lote
+                ventana = []
+                for fila in lote:
+                    fecha = fila[11]
+                    if fecha is not None and fecha < corte:
+                        cerradas[fecha] += 1
+                    else:
+                        ventana.append(codificar_fila(cur, codigos, fila))
+                cur.executemany(f"INSERT INTO temp.ventana VALUES ({marcadores})", ventana)
+
+        # Las filas de la ventana en la base (con su rowid) y en el archivo (sin rowid),
+        # ordenadas por contenido: las iguales quedan juntas y se comparan de a un grupo.
+        # Lo que sobra en la base ya no existe (o cambió) y se borra; lo que sobra en el
+        # archivo es nuevo. En memoria hay un grupo y un lote de cambios por vez. Las
+        # fechas nulas van en su propia rama: con un OR, SQLite junta los rowid de
+        # los dos rangos del índice en memoria, y eso crece con la ventana.
+        bosquejos = leer_bosquejos(cur)
+        lector = conn.cursor()
+        lector.execute(f"""
+            SELECT rowid, {columnas} FROM casos WHERE fecha_diagnostico >= ?
+            UNION ALL
+            SELECT rowid, {columnas} FROM casos WHERE fecha_diagnostico IS NULL
+            UNION ALL
+            SELECT NULL, {columnas} FROM temp.ventana
+            ORDER BY {columnas}
+        """, (corte,))
+        nuevas = []
+        viejas = []
+        primera = operator.itemgetter(0)
+        for fila, grupo in itertools.groupby(lector, key=operator.itemgetter(slice(1, None))):
+            rowids = list(map(primera, grupo))
+            en_archivo = rowids.count(None)
+            en_base = [rowid for rowid in rowids if rowid is not None] if en_archivo < len(rowids) else []
+            iguales += min(en_archivo, len(en_base))
+            for rowid in en_base[en_archivo:]:
+                viejas.append((rowid,))
+                contar_cambios_cubos(cambios_cubos, fila, -1)
+            for _ in range(en_archivo - len(en_base)):
+                nuevas.append(fila)
+                contar_cambios_cubos(cambios_cubos, fila)
+            if len(nuevas) >= tamano_lote or len(viejas) >= tamano_lote:
+                cur.executemany(f"INSERT INTO casos VALUES ({marcadores})", nuevas)
+                cur.executemany("DELETE FROM casos WHERE rowid = ?", viejas)
+                bosquejos.agregar_lote(nuevas)
+                insertadas += len(nuevas)
+                borradas += len(viejas)
+                nuevas = []
+                viejas = []
+        cur.executemany(f"INSERT INTO casos VALUES ({marcadores})", nuevas)
+        cur.executemany("DELETE FROM casos WHERE rowid = ?", viejas)
+        bosquejos.agregar_lote(nuevas)
+        insertadas += len(nuevas)
+        borradas += len(viejas)
+        cur.execute("DROP TABLE temp.ventana")
+
+        cur.execute("""
+            SELECT fecha_diagnostico, COUNT(*) FROM casos
+            WHERE fecha_diagnostico < ?
+            GROUP BY fecha_diagnostico
+        """, (corte,))
+        cerradas.subtract(dict(cur.fetchall()))
+        distintas = sum(abs(diferencia) for diferencia in cerradas.values())
+        actualizar_cubos(cur, cambios_cubos)
+        # Las filas nuevas ya se sumaron a los bosquejos; solo si se borró alguna hay
+        # que recorrer casos para armarlos de nuevo
+        if borradas:
+            reconstruir_bosquejos(cur, tamano_lote)
+        elif insertadas:
+            bosquejos.guardar(cur)
+        calidad.guardar(cur)
+        registrar_carga(cur, insertadas - borradas)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        aplicar_pragmas(cur, anteriores)
+        conn.close()
 
-    for var, tipo, clasificacion in variables:
-        print(f"🔸 Variable: {var}")
-        print(f"   Tipo: {tipo}")
-        print(f"   Clasificación: {clasificacion}")
-        
-        if var == "edad":
-            cur.execute("SELECT MIN(edad), MAX(edad) FROM casos WHERE edad IS NOT NULL AND edad != ''")
-            minimo, maximo = cur.fetchone()
-            print(f"   Rango: {minimo} a {maximo}")
-        else:
-            cur.execute(f"SELECT DISTINCT {var} FROM casos WHERE {var} IS NOT NULL AND {var} != ''")
-            valores = [fila[0] for fila in cur.fetchall()]
-            print(f"   Valores posibles (ejemplo): {', '.join(valores[:5])}...")
-        print("")
+    segundos = time.perf_counter() - inicio
+    print(f"✅ Carga incremental desde {corte}: {insertadas} filas nuevas, {borradas} borradas, "
+          f"{iguales} sin cambios ({segundos:.2f} s).")
+    if distintas:
+        print(f"⚠️ {distintas} filas con fecha anterior a {corte} no coinciden con la base (cambios viejos o "
+              f"fechas corregidas hacia atrás). Esas filas no se actualizaron: haga una carga completa.")
+    if rechazadas:
+        print(f"⚠️ {rechazadas} filas sin 12 columnas guardadas en {ruta_rechazos}.")
+
+
+# Consultas de los reportes, por nombre. Tenerlas juntas permite revisar sus
+# planes de ejecución (asesor_indices) sin correr cada reporte. Todas leen el cubo
+# (sumando cantidad) o el perfil de calidad en lugar de recorrer casos.
+CONSULTAS = {
+    "punto1_rango_edad": "SELECT MIN(edad), MAX(edad) FROM cubo",
+    "punto2_total": "SELECT COALESCE(SUM(cantidad), 0) FROM cubo",
+    "punto2_sin_edad": "SELECT COALESCE(SUM(cantidad), 0) FROM cubo WHERE edad IS NULL",
+    "punto2_edad_invalida": "SELECT COALESCE(SUM(invalidos), 0) FROM calidad WHERE variable = 'edad'",
+    "valores": "SELECT frecuencias FROM calidad WHERE variable = ?",
+    "calidad": """
+        SELECT variable, filas, nulos, vacios, con_espacios, invalidos, distintos, truncado, minimo, maximo, variantes
+        FROM calidad
+        ORDER BY rowid
+    """,
+    "calidad_rechazadas": "SELECT COALESCE(SUM(valor), 0) FROM metadatos WHERE clave = 'filas_rechazadas'",
+    "calidad_variable": "SELECT frecuencias, nulos, variantes FROM calidad WHERE variable = ?",
+    "punto3_promedio_por_provincia": """
+        SELECT p.nombre, SUM(cu.edad * cu.cantidad) * 1.0 / SUM(cu.cantidad)
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        WHERE cu.fallecido = 1 AND cu.edad IS NOT NULL
+        GROUP BY cu.residencia_provincia_id
+        ORDER BY p.nombre
+    """,
+    "punto3_frecuencia_edades_fallecidos": """
+        SELECT edad, SUM(cantidad) FROM cubo
+        WHERE fallecido = 1 AND edad IS NOT NULL
+        GROUP BY edad
+        ORDER BY edad
+    """,
+    "frecuencia_edades_fallecidos_por_provincia": """
+        SELECT p.nombre, cu.edad, SUM(cu.cantidad)
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        WHERE cu.fallecido = 1 AND cu.edad IS NOT NULL
+        GROUP BY cu.residencia_provincia_id, cu.edad
+        ORDER BY p.nombre, cu.edad
+    """,
+    "frecuencia_edades_fallecidos_por_sexo": """
+        SELECT s.codigo, cu.edad, SUM(cu.cantidad)
+        FROM cubo cu
+        JOIN sexos s ON s.id = cu.sexo_id
+        WHERE cu.fallecido = 1 AND cu.edad IS NOT NULL
+        GROUP BY cu.sexo_id, cu.edad
+        ORDER BY s.codigo, cu.edad
+    """,
+    "punto4_frecuencia_edades_confirmados": """
+        SELECT edad, SUM(cantidad) FROM cubo
+        WHERE edad BETWEEN 0 AND 120
+        AND clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY edad
+        ORDER BY edad
+    """,
+    "punto5_frecuencia_mujeres_fallecidas": """
+        SELECT edad, SUM(cantidad) FROM cubo
+        WHERE sexo_id = (SELECT id FROM sexos WHERE codigo = 'F') AND fallecido = 1
+        AND edad BETWEEN 0 AND 120
+        GROUP BY edad
+    """,
+    "punto5_frecuencia_hombres": """
+        SELECT edad, SUM(cantidad), SUM(CASE WHEN fallecido = 1 THEN cantidad ELSE 0 END) FROM cubo
+        WHERE sexo_id = (SELECT id FROM sexos WHERE codigo = 'M')
+        AND edad BETWEEN 0 AND 120
+        GROUP BY edad
+    """,
+    "punto6_provincia_con_mas_confirmados": """
+        SELECT p.nombre, SUM(cu.cantidad) AS cantidad
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        WHERE cu.sexo_id = (SELECT id FROM sexos WHERE codigo = ?)
+        AND cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY cu.residencia_provincia_id
+        ORDER BY cantidad DESC
+        LIMIT 1
+    """,
+    # Cruces con el censo (tablas temporales de preparar_censo): una fila por provincia
+    # (o provincia y sexo) con los casos y la población, o población NULL si no está
+    "censo_confirmados_por_provincia": """
+        SELECT MIN(p.nombre), SUM(cu.cantidad), ce.poblacion
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        JOIN temp.provincias_censo pc ON pc.provincia_id = cu.residencia_provincia_id
+        LEFT JOIN (SELECT provincia, SUM(poblacion) AS poblacion FROM temp.censo GROUP BY provincia) ce
+            ON ce.provincia = pc.provincia
+        WHERE cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY pc.provincia
+    """,
+    "censo_fallecidos_por_provincia": """
+        SELECT MIN(p.nombre), SUM(cu.cantidad), ce.poblacion
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        JOIN temp.provincias_censo pc ON pc.provincia_id = cu.residencia_provincia_id
+        LEFT JOIN (SELECT provincia, SUM(poblacion) AS poblacion FROM temp.censo GROUP BY provincia) ce
+            ON ce.provincia = pc.provincia
+        WHERE cu.fallecido = 1
+        AND cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY pc.provincia
+    """,
+    "censo_confirmados_por_provincia_y_sexo": """
+        SELECT MIN(p.nombre), s.codigo, SUM(cu.cantidad), ce.poblacion
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        JOIN sexos s ON s.id = cu.sexo_id
+        JOIN temp.provincias_censo pc ON pc.provincia_id = cu.residencia_provincia_id
+        LEFT JOIN temp.censo ce ON ce.provincia = pc.provincia AND ce.sexo = s.codigo
+        WHERE cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        AND s.codigo IN ('F', 'M')
+        GROUP BY pc.provincia, s.codigo
+    """,
+    "censo_fallecidos_por_provincia_y_sexo": """
+        SELECT MIN(p.nombre), s.codigo, SUM(cu.cantidad), ce.poblacion
+        FROM cubo cu
+        JOIN provincias p ON p.id = cu.residencia_provincia_id
+        JOIN sexos s ON s.id = cu.sexo_id
+        JOIN temp.provincias_censo pc ON pc.provincia_id = cu.residencia_provincia_id
+        LEFT JOIN temp.censo ce ON ce.provincia = pc.provincia AND ce.sexo = s.codigo
+        WHERE cu.fallecido = 1
+        AND cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        AND s.codigo IN ('F', 'M')
+        GROUP BY pc.provincia, s.codigo
+    """,
+    # Confirmados y fallecidos confirmados por provincia y día, para las series temporales
+    "serie_diaria_por_provincia": """
+        SELECT p.nombre, c.fecha_diagnostico, SUM(cl.confirmado), SUM(cl.confirmado AND c.fallecido = 1)
+        FROM casos c
+        JOIN provincias p ON p.id = c.residencia_provincia_id
+        JOIN clasificaciones cl ON cl.id = c.clasificacion_id
+        WHERE c.fecha_diagnostico IS NOT NULL
+        GROUP BY c.residencia_provincia_id, c.fecha_diagnostico
+    """,
+    # Confirmados, fallecidos y con asistencia respiratoria mecánica por departamento
+    "departamentos_confirmados": """
+        SELECT p.nombre, d.nombre, SUM(cd.cantidad),
+               SUM(CASE WHEN cd.fallecido = 1 THEN cd.cantidad ELSE 0 END),
+               SUM(CASE WHEN cd.asistencia_respiratoria_mecanica = 1 THEN cd.cantidad ELSE 0 END)
+        FROM cubo_departamentos cd
+        JOIN departamentos d ON d.id = cd.residencia_departamento_id
+        LEFT JOIN provincias p ON p.id = d.provincia_id
+        WHERE cd.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY cd.residencia_departamento_id
+    """,
+    "clasificaciones": "SELECT nombre FROM clasificaciones ORDER BY id",
+    "diagnostico_confirmados_por_sexo": """
+        SELECT s.codigo, SUM(cu.cantidad) FROM cubo cu
+        LEFT JOIN sexos s ON s.id = cu.sexo_id
+        WHERE cu.clasificacion_id IN (SELECT id FROM clasificaciones WHERE confirmado = 1)
+        GROUP BY cu.sexo_id
+    """,
+}
+registrar_consultas(CONSULTAS)
+
+# Valores distintos de una variable como texto, en el orden en que aparecen en el
+# CSV (como el SELECT DISTINCT original), a partir de las frecuencias del perfil de calidad
+def valores_perfil(filas, clasificacion):
+    if not filas:
+        return []
+    return [texto_valor(valor, None, clasificacion) for valor, _ in json.loads(filas[0][0])]
+
+# Caché de resultados en un archivo aparte (así covid.db se puede abrir solo para
+# lectura). Cada resultado se guarda junto con la huella de los datos con los que se
+# calculó; si la huella cambió (hubo una carga nueva) el resultado ya no sirve.
+RUTA_CACHE = "covid_cache.db"
+USAR_CACHE = True
+
+def huella_datos(conn):
+    try:
+        metadatos = dict(conn.execute("SELECT clave, valor FROM metadatos"))
+    except sqlite3.OperationalError:
+        return None
+    if "carga" not in metadatos:
+        return None
+    datos = [metadatos.get(clave, "") for clave in ["carga", "generacion", "filas", "csv_mtime", "csv_tamano"]]
+    return "|".join([str(VERSION_ESQUEMA), os.path.abspath(RUTA_DB)] + datos)
+
+# La comparten todos los hilos de la sesión: cada operación toma el candado
+class CacheResultados:
+    def __init__(self, ruta=RUTA_CACHE):
+        self.conn = sqlite3.connect(ruta, check_same_thread=False)
+        self.candado = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                clave TEXT PRIMARY KEY,
+                huella TEXT NOT NULL,
+                valor TEXT NOT NULL
+            )
+        """)
+
+    def obtener(self, clave, huella):
+        with self.candado:
+            fila = self.conn.execute("SELECT valor FROM resultados WHERE clave = ? AND huella = ?", (clave, huella)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def guardar(self, clave, huella, valor):
+        with self.candado:
+            # Lo calculado con otra huella ya no se va a usar
+            self.conn.execute("DELETE FROM resultados WHERE huella != ?", (huella,))
+            self.conn.execute("INSERT OR REPLACE INTO resultados (clave, huella, valor) VALUES (?, ?, ?)",
+                              (clave, huella, json.dumps(valor)))
+            self.conn.commit()
+
+    def vaciar(self):
+        with self.candado:
+            self.conn.execute("DELETE FROM resultados")
+            self.conn.commit()
+
+    def close(self):
+        with self.candado:
+            self.conn.close()
+
+# Devuelve lo guardado en la caché para "clave" o lo calcula y lo guarda
+def con_cache(cache, huella, clave, calcular):
+    if cache is None or huella is None:
+        return calcular()
+    valor = cache.obtener(clave, huella)
+    if valor is None:
+        valor = calcular()
+        cache.guardar(clave, huella, valor)
+    return valor
+
+# Fuente de datos de los reportes: ejecuta las consultas por nombre contra covid.db
+class FuenteSQLite:
+    def __init__(self, conn, cache=None):
+        self.conn = conn
+        self.cache = cache
+        self.huella = huella_datos(conn) if cache is not None else None
+        self.censo_preparado = None
+
+    def consultar(self, nombre, parametros=()):
+        clave = [nombre, list(parametros)]
+        if nombre.startswith("censo_"):
+            # El resultado depende también del archivo del censo
+            clave.append(firma_censo())
+        return con_cache(self.cache, self.huella, json.dumps(clave), lambda: self.ejecutar(nombre, parametros))
+
+    def ejecutar(self, nombre, parametros):
+        if nombre.startswith("censo_") and self.censo_preparado != firma_censo():
+            preparar_censo(self.conn)
+            self.censo_preparado = firma_censo()
+        return ejecutar_sql(self.conn, nombre, CONSULTAS[nombre], parametros)
+
+    def valores(self, var, clasificacion):
+        clave = json.dumps(["valores", var])
+        return con_cache(self.cache, self.huella, clave,
+                         lambda: valores_perfil(ejecutar_sql(self.conn, f"valores_{var}", CONSULTAS["valores"], (var,)),
+                                                clasificacion))
+
+# Sesión de lectura: un pool de conexiones de solo lectura a covid.db que comparten
+# todos los reportes (y varios hilos a la vez), en lugar de abrir y cerrar una
+# conexión en cada función. Las conexiones se reutilizan con su caché de páginas,
+# el archivo mapeado en memoria y sus sentencias preparadas, así que correr los
+# reportes uno tras otro no vuelve a pagar esos costos. Las cargas siguen usando su
+# propia conexión de escritura.
+PRAGMAS_LECTURA = {
+    "mmap_size": 268435456,  # 256 MB del archivo mapeados en memoria
+    "cache_size": -65536,  # 64 MB de caché de páginas por conexión
+    "temp_store": "MEMORY",
+    "query_only": 1,
+}
+SENTENCIAS_EN_CACHE = 256  # sentencias preparadas que guarda cada conexión
+MAXIMO_CONEXIONES = os.cpu_count() or 4
+
+def conectar_lectura(ruta=RUTA_DB):
+    uri = pathlib.Path(ruta).absolute().as_uri() + "?mode=ro"
+    conn = conectar(uri, uri=True, check_same_thread=False, cached_statements=SENTENCIAS_EN_CACHE)
+    aplicar_pragmas(conn.cursor(), PRAGMAS_LECTURA)
+    return conn
+
+# Cada hilo toma una conexión libre (o se abre una nueva, hasta el máximo) y la
+# devuelve al terminar; nunca dos hilos usan la misma conexión al mismo tiempo.
+class PoolConexiones:
+    def __init__(self, ruta=RUTA_DB, maximo=MAXIMO_CONEXIONES):
+        self.ruta = ruta
+        self.libres = queue.LifoQueue()
+        self.disponibles = threading.BoundedSemaphore(maximo)
+        self.abiertas = []
+        self.candado = threading.Lock()
+
+    @contextlib.contextmanager
+    def conexion(self):
+        with self.disponibles:
+            try:
+                conn = self.libres.get_nowait()
+            except queue.Empty:
+                conn = conectar_lectura(self.ruta)
+                with self.candado:
+                    self.abiertas.append(conn)
+            try:
+                yield conn
+            finally:
+                self.libres.put(conn)
+
+    def close(self):
+        with self.candado:
+            for conn in self.abiertas:
+                conn.close()
+            self.abiertas.clear()
+            self.libres = queue.LifoQueue()
+
+class Sesion:
+    def __init__(self, ruta=RUTA_DB):
+        self.ruta = ruta
+        self.pool = PoolConexiones(ruta)
+        self.cache_resultados = None
+
+    # La caché de resultados se abre la primera vez que se usa
+    @property
+    def cache(self):
+        if not USAR_CACHE:
+            return None
+        if self.cache_resultados is None:
+            self.cache_resultados = CacheResultados()
+        return self.cache_resultados
+
+    def conexion(self):
+        return self.pool.conexion()
+
+    @contextlib.contextmanager
+    def fuente(self):
+        with self.pool.conexion() as conn:
+            yield FuenteSQLite(conn, self.cache)
+
+    def close(self):
+        self.pool.close()
+        if self.cache_resultados is not None:
+            self.cache_resultados.close()
+            self.cache_resultados = None
+
+# Sesión compartida del programa (se crea la primera vez que se pide)
+SESION = None
+CANDADO_SESION = threading.Lock()
+
+def obtener_sesion():
+    global SESION
+    with CANDADO_SESION:
+        if SESION is None or SESION.ruta != RUTA_DB:
+            if SESION is not None:
+                SESION.close()
+            SESION = Sesion(RUTA_DB)
+        return SESION
+
+def cerrar_sesion():
+    global SESION
+    with CANDADO_SESION:
+        if SESION is not None:
+            SESION.close()
+            SESION = None
+
+# Presupuesto de memoria, apagado por defecto. Con la variable de entorno
+# COVID_MEMORIA_MB (o --memoria en la línea de comandos) los tamaños de lote y de
+# rango y las cachés de SQLite salen del presupuesto en lugar de ser fijos, así que
+# la memoria pico no crece con la cantidad de filas: las cargas y los recorridos
+# leen de a lotes (fetchmany, to_batches) y van sumando agregados parciales, y los
+# ordenamientos grandes de SQLite pasan a disco. Los reportes leen el cubo y el
+# perfil de calidad, que crecen con los valores distintos y no con las filas. Del
+# presupuesto, FRACCION_LOTES es para las filas en Python (lotes de la carga y rangos
+# del modo paralelo en vuelo) y FRACCION_SQLITE para SQLite (caché de páginas, archivo
+# mapeado y límite del heap); el resto queda para el intérprete y los resultados.
+PRESUPUESTO_MEMORIA_MB = None
+FRACCION_LOTES = 0.4
+FRACCION_SQLITE = 0.3
+BYTES_POR_FILA = 2048  # una fila del CSV leída, normalizada y codificada, en objetos de Python
+EXPANSION_RANGO = 15  # cuánto más ocupa un rango del CSV ya parseado que en el archivo
+LOTE_MINIMO = 1000
+RANGO_MINIMO = 1024 * 1024
+# Valores sin presupuesto, para poder volver a ellos
+SIN_PRESUPUESTO = (TAMANO_LOTE, dict(PRAGMAS_CARGA), dict(PRAGMAS_LECTURA))
+
+def aplicar_presupuesto(megabytes):
+    global PRESUPUESTO_MEMORIA_MB, TAMANO_LOTE
+    lote, pragmas_carga, pragmas_lectura = SIN_PRESUPUESTO
+    PRESUPUESTO_MEMORIA_MB = megabytes
+    PRAGMAS_CARGA.clear()
+    PRAGMAS_CARGA.update(pragmas_carga)
+    PRAGMAS_LECTURA.clear()
+    PRAGMAS_LECTURA.update(pragmas_lectura)
+    TAMANO_LOTE = lote
+    if megabytes:
+        presupuesto = megabytes * 1024 * 1024
+        TAMANO_LOTE = int(max(LOTE_MINIMO, min(lote, presupuesto * FRACCION_LOTES / BYTES_POR_FILA)))
+        sqlite_kib = int(presupuesto * FRACCION_SQLITE / 1024)
+        # cache_size negativo = KiB; el límite del heap es para todo el proceso
+        PRAGMAS_CARGA["cache_size"] = -min(-pragmas_carga["cache_size"], sqlite_kib)
+        PRAGMAS_CARGA["soft_heap_limit"] = sqlite_kib * 1024
+        PRAGMAS_CARGA["temp_store"] = "FILE"
+        PRAGMAS_LECTURA["cache_size"] = -min(-pragmas_lectura["cache_size"], sqlite_kib // MAXIMO_CONEXIONES)
+        PRAGMAS_LECTURA["mmap_size"] = min(pragmas_lectura["mmap_size"], sqlite_kib * 1024)
+        PRAGMAS_LECTURA["temp_store"] = "FILE"
+        PRAGMAS_LECTURA["soft_heap_limit"] = sqlite_kib * 1024
+    # Las conexiones de lectura nuevas toman los pragmas
+    cerrar_sesion()
+
+# Tamaño de cada rango del modo paralelo: hay hasta dos rangos parseados por proceso
+# en vuelo, así que con presupuesto se achica según la cantidad de procesos
+def rango_para(procesos):
+    if not PRESUPUESTO_MEMORIA_MB:
+        return TAMANO_RANGO
+    por_rango = PRESUPUESTO_MEMORIA_MB * 1024 * 1024 * FRACCION_LOTES / (2 * procesos * EXPANSION_RANGO)
+    return int(max(RANGO_MINIMO, min(TAMANO_RANGO, por_rango)))
+
+if os.environ.get("COVID_MEMORIA_MB"):
+    aplicar_presupuesto(int(os.environ["COVID_MEMORIA_MB"]))
+
+# Modo aproximado: los valores de ejemplo del punto 1 salen de los bosquejos en
+# lugar de recorrer casos con SELECT DISTINCT. Las demás consultas ya leen cubos
+# chicos y quedan exactas.
+APROXIMADO = False
+
+# Texto de los valores como se guardan en casos (ids, 0/1 o texto)
+def nombres_valores(conn, var):
+    if var in COLUMNAS_CODIFICADAS:
+        _, tabla, texto = COLUMNAS_CODIFICADAS[var]
+        return dict(conn.execute(f"SELECT id, {texto} FROM {tabla}"))
+    return None
+
+def texto_valor(valor, nombres, clasificacion):
+    if nombres is not None:
+        return nombres.get(valor)
+    if clasificacion == "Binaria":
+        return "SI" if valor == 1 else "NO"
+    return str(valor)
+
+class FuenteAproximada:
+    def __init__(self, fuente):
+        self.fuente = fuente
+        self.conn = fuente.conn
+
+    def consultar(self, nombre, parametros=()):
+        return self.fuente.consultar(nombre, parametros)
+
+    # Los valores más frecuentes según el count-min, del más al menos frecuente
+    # (los departamentos con el mismo nombre en varias provincias aparecen una vez)
+    def valores(self, var, clasificacion):
+        try:
+            fila = self.conn.execute("SELECT parametros FROM bosquejos WHERE variable = ? AND tipo = 'cms'", (var,)).fetchone()
+        except sqlite3.OperationalError:
+            fila = None
+        if fila is None:
+            return self.fuente.valores(var, clasificacion)
+        nombres = nombres_valores(self.conn, var)
+        textos = (texto_valor(valor, nombres, clasificacion) for valor, _ in json.loads(fila[0])["candidatos"])
+        return [texto for texto in dict.fromkeys(textos) if texto is not None]
+
+def cambiar_modo_aproximado():
+    global APROXIMADO
+    APROXIMADO = not APROXIMADO
+    print(f"✅ Valores de ejemplo del punto 1: {'aproximados (bosquejos)' if APROXIMADO else 'exactos'}")
+
+# Si el reporte no recibe una fuente, toma una conexión de la sesión compartida
+# (y la devuelve al pool al terminar)
+@contextlib.contextmanager
+def abrir_fuente(fuente=None):
+    if fuente is not None:
+        yield fuente
+        return
+    if ALMACEN == "parquet":
+        yield FuenteParquet()
+        return
+    with obtener_sesion().fuente() as fuente:
+        yield FuenteAproximada(fuente) if APROXIMADO else fuente
+
+def vaciar_cache():
+    cache = obtener_sesion().cache
+    if cache is None:
+        with contextlib.closing(CacheResultados()) as cache:
+            cache.vaciar()
+    else:
+        cache.vaciar()
+    print("✅ Caché de resultados vaciada.")
 
-    conn.close()
+# Punto 1 - Descripción de variables
+@perfilado
+def punto1_describir_variables(fuente=None):
+    with abrir_fuente(fuente) as fuente:
+        print("\n📊 Punto 1: Descripción de las variables\n")
+
+        for var, tipo, clasificacion in VARIABLES:
+            print(f"🔸 Variable: {var}")
+            print(f"   Tipo: {tipo}")
+            print(f"   Clasificación: {clasificacion}")
+
+            if var == "edad":
+                minimo, maximo = fuente.consultar("punto1_rango_edad")[0]
+                print(f"   Rango: {minimo} a {maximo}")
+            else:
+                valores = fuente.valores(var, clasificacion)
+                print(f"   Valores posibles (ejemplo): {', '.join(valores[:5])}...")
+            print("")
 
 # Punto 2 - Valores faltantes en edad
-def punto2_edad_faltante():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
-
-    cur.execute("SELECT COUNT(*) FROM casos")
-    total = cur.fetchone()[0]
-
-    cur.execute("SELECT COUNT(*) FROM casos WHERE edad IS NULL OR edad = ''")
-    faltantes = cur.fetchone()[0]
+@perfilado
+def punto2_edad_faltante(fuente=None):
+    with abrir_fuente(fuente) as fuente:
+        total = fuente.consultar("punto2_total")[0][0]
+        faltantes = fuente.consultar("punto2_sin_edad")[0][0]
+        invalidas = fuente.consultar("punto2_edad_invalida")[0][0]
 
     porcentaje = (faltantes / total) * 100
 
     print("\n Punto 2: Análisis de valores faltantes en 'edad'")
     print(f"Total de registros: {total}")
     print(f"Registros sin edad: {faltantes}")
+    if invalidas:
+        print(f"   (de ellos {invalidas} tienen una edad escrita que no es un número entero)")
     print(f"Porcentaje de faltantes: {porcentaje:.2f}%")
 
     if porcentaje < 5:
@@ -106,91 +1324,80 @@ def punto2_edad_faltante():
     else:
         print("⚠️ Recomendación: Reemplazar los valores faltantes con un valor central (media o mediana).")
 
-    conn.close()
-
-def punto3_promedio_edad_fallecidos():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
-
-    print("\n Punto 3: Edad promedio de fallecidos por provincia")
+@perfilado
+def punto3_promedio_edad_fallecidos(fuente=None):
+    with abrir_fuente(fuente) as fuente:
+        print("\n Punto 3: Edad promedio de fallecidos por provincia")
 
-    # Calcular edad promedio de fallecidos por provincia
-    cur.execute("""
-        SELECT residencia_provincia_nombre, AVG(edad)
-        FROM casos
-        WHERE fallecido = 'SI' AND edad IS NOT NULL AND edad != ''
-        GROUP BY residencia_provincia_nombre
-        ORDER BY residencia_provincia_nombre
-    """)
-    resultados = cur.fetchall()
+        # Calcular edad promedio de fallecidos por provincia
+        resultados = fuente.consultar("punto3_promedio_por_provincia")
 
-    for provincia, promedio in resultados:
-        print(f"🧾 {provincia}: {promedio:.2f} años")
+        for provincia, promedio in resultados:
+            print(f"🧾 {provincia}: {promedio:.2f} años")
 
-    # Parte 2: detectar outliers en edad de fallecidos
-    print("\n Detección de outliers en edades de fallecidos (criterio IQR)")
+        # Parte 2: detectar outliers en edad de fallecidos
+        print("\n Detección de outliers en edades de fallecidos (criterio IQR)")
 
-    # Obtener todas las edades de fallecidos válidas
-    cur.execute("""
-        SELECT edad FROM casos
-        WHERE fallecido = 'SI' AND edad IS NOT NULL AND edad != ''
-        ORDER BY edad
-    """)
-    edades = [int(f[0]) for f in cur.fetchall()]
+        # Frecuencia de cada edad de fallecidos válida (a lo sumo ~120 filas)
+        frecuencias = fuente.consultar("punto3_frecuencia_edades_fallecidos")
 
-    if len(edades) < 4:
+    cuartiles = calcular_cuartiles(frecuencias)
+    if cuartiles is None:
         print("⚠️ No hay suficientes datos para detectar outliers.")
-        conn.close()
         return
 
-    # Calcular Q1, Q3 y IQR
-    def calcular_cuartiles(lista):
-        n = len(lista)
-        Q1 = lista[n // 4]
-        Q3 = lista[3 * n // 4]
-        IQR = Q3 - Q1
-        return Q1, Q3, IQR
-
-    Q1, Q3, IQR = calcular_cuartiles(edades)
-    lim_inf = Q1 - 1.5 * IQR
-    lim_sup = Q3 + 1.5 * IQR
-
+    Q1, Q3, IQR, lim_inf, lim_sup = cuartiles
     print(f"Q1: {Q1} | Q3: {Q3} | IQR: {IQR}")
     print(f"Límite inferior: {lim_inf}")
     print(f"Límite superior: {lim_sup}")
 
-    outliers = [e for e in edades if e < lim_inf or e > lim_sup]
-    print(f"🔍 Se encontraron {len(outliers)} outliers en las edades de fallecidos.")
-    if outliers:
-        print(f"Ejemplos: {outliers[:10]}...")
-
-    conn.close()
+    cantidad, ejemplos = contar_outliers(frecuencias, lim_inf, lim_sup)
+    print(f"🔍 Se encontraron {cantidad} outliers en las edades de fallecidos.")
+    if cantidad:
+        print(f"Ejemplos: {ejemplos}...")
+
+# Cuartiles y outliers de edad de fallecidos dentro de cada provincia y cada sexo
+@perfilado
+def cuartiles_fallecidos_por_grupo(fuente=None):
+    print("\n📦 Cuartiles y outliers de edad de fallecidos por provincia y por sexo")
+
+    with abrir_fuente(fuente) as fuente:
+        tablas = [
+            ("Provincia", fuente.consultar("frecuencia_edades_fallecidos_por_provincia")),
+            ("Sexo", fuente.consultar("frecuencia_edades_fallecidos_por_sexo")),
+        ]
+
+    for titulo, filas in tablas:
+        print(f"\n{titulo:<25} {'Fallecidos':>10} {'Q1':>5} {'Q3':>5} {'IQR':>5} {'Outliers':>9}")
+        print("-" * 64)
+        for grupo, grupo_filas in itertools.groupby(filas, key=lambda fila: fila[0]):
+            frecuencias = [(edad, cantidad) for _, edad, cantidad in grupo_filas]
+            n = sum(cantidad for _, cantidad in frecuencias)
+            cuartiles = calcular_cuartiles(frecuencias)
+            if cuartiles is None:
+                print(f"{grupo:<25} {n:>10} {'-':>5} {'-':>5} {'-':>5} {'-':>9}")
+                continue
+            Q1, Q3, IQR, lim_inf, lim_sup = cuartiles
+            cantidad, _ = contar_outliers(frecuencias, lim_inf, lim_sup)
+            print(f"{grupo:<25} {n:>10} {Q1:>5} {Q3:>5} {IQR:>5} {cantidad:>9}")
 
 import math
 
-def punto4_sturges_intervalos():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
-
+@perfilado
+def punto4_sturges_intervalos(fuente=None):
     print("\n Punto 4: Tabla de intervalos de edad (método de Sturges)")
 
-    # Obtener edades válidas y confirmadas entre 0 y 120
-    cur.execute("""
-        SELECT CAST(edad AS INTEGER) FROM casos
-        WHERE edad IS NOT NULL AND edad != ''
-        AND CAST(edad AS INTEGER) BETWEEN 0 AND 120
-        AND LOWER(clasificacion) LIKE '%confirmado%'
-    """)
-
-    edades = [fila[0] for fila in cur.fetchall()]
-    n = len(edades)
+    # Frecuencia de cada edad válida y confirmada entre 0 y 120
+    with abrir_fuente(fuente) as fuente:
+        frecuencias = fuente.consultar("punto4_frecuencia_edades_confirmados")
+    n = sum(cantidad for _, cantidad in frecuencias)
 
     if n == 0:
         print("❌ No hay datos suficientes.")
         return
 
-    edad_min = min(edades)
-    edad_max = max(edades)
+    edad_min = min(edad for edad, _ in frecuencias)
+    edad_max = max(edad for edad, _ in frecuencias)
     rango = edad_max - edad_min
 
     # Método de Sturges
@@ -211,64 +1418,33 @@ def punto4_sturges_intervalos():
         inferior = superior + 1
 
     # Contar frecuencias
-    frecuencias = []
-    for inf, sup in intervalos:
-        conteo = sum(1 for edad in edades if inf <= edad <= sup)
-        frecuencias.append((f"{inf} - {sup}", conteo))
+    conteos = contar_por_intervalo(frecuencias, edad_min, ancho_clase, k)
 
     # Mostrar tabla
     print("\n📊 Intervalos de edad (casos confirmados):\n")
     print(f"{'Intervalo':<15} {'Frecuencia':>10}")
     print("-" * 28)
-    for intervalo, frec in frecuencias:
-        print(f"{intervalo:<15} {frec:>10}")
+    for (inf, sup), frec in zip(intervalos, conteos):
+        print(f"{f'{inf} - {sup}':<15} {frec:>10}")
 
-    conn.close()
-
-
-def punto5_mujeres_hombres_fallecidos_por_intervalo():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
 
+@perfilado
+def punto5_mujeres_hombres_fallecidos_por_intervalo(fuente=None):
     print("\n Punto 5: Intervalo con más mujeres fallecidas y mayor % de hombres fallecidos")
 
     # Crear intervalos fijos de 5 años (de 0 a 104)
     intervalos = [(i, i + 4) for i in range(0, 105, 5)]
     k = len(intervalos)
 
-    # Inicializar contadores
-    mujeres_fallecidas = [0] * k
-    hombres_fallecidos = [0] * k
-    hombres_totales = [0] * k
-
-    # Mujeres fallecidas por edad
-    cur.execute("""
-        SELECT CAST(edad AS INTEGER) FROM casos
-        WHERE sexo = 'F' AND fallecido = 'SI'
-        AND edad IS NOT NULL AND edad != ''
-        AND CAST(edad AS INTEGER) BETWEEN 0 AND 120
-    """)
-    for edad in cur.fetchall():
-        edad = edad[0]
-        for i, (inicio, fin) in enumerate(intervalos):
-            if inicio <= edad <= fin:
-                mujeres_fallecidas[i] += 1
-                break
+    with abrir_fuente(fuente) as fuente:
+        # Mujeres fallecidas por edad
+        mujeres = fuente.consultar("punto5_frecuencia_mujeres_fallecidas")
+        # Hombres totales y fallecidos por edad
+        hombres = fuente.consultar("punto5_frecuencia_hombres")
 
-    # Hombres fallecidos y totales por edad
-    cur.execute("""
-        SELECT CAST(edad AS INTEGER), fallecido FROM casos
-        WHERE sexo = 'M'
-        AND edad IS NOT NULL AND edad != ''
-        AND CAST(edad AS INTEGER) BETWEEN 0 AND 120
-    """)
-    for edad, fallecido in cur.fetchall():
-        for i, (inicio, fin) in enumerate(intervalos):
-            if inicio <= edad <= fin:
-                hombres_totales[i] += 1
-                if fallecido.strip().upper() == 'SI':
-                    hombres_fallecidos[i] += 1
-                break
+    mujeres_fallecidas = contar_por_intervalo(mujeres, 0, 5, k)
+    hombres_totales = contar_por_intervalo([(edad, total) for edad, total, _ in hombres], 0, 5, k)
+    hombres_fallecidos = contar_por_intervalo([(edad, fallecidos) for edad, _, fallecidos in hombres], 0, 5, k)
 
     # Calcular porcentajes
     porcentaje_hombres = []
@@ -291,87 +1467,47 @@ def punto5_mujeres_hombres_fallecidos_por_intervalo():
     print(f"\n✅ Intervalo con más mujeres fallecidas: {intervalos[max_mujeres_idx]}")
     print(f"✅ Intervalo con mayor % de hombres fallecidos: {intervalos[max_porcentaje_idx]}")
 
-    conn.close()
-
-
-def punto6_confirmados_por_provincia_y_sexo():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
 
+@perfilado
+def punto6_confirmados_por_provincia_y_sexo(fuente=None):
     print("\n Punto 6: Provincia con más casos confirmados por sexo")
 
+    with abrir_fuente(fuente) as fuente:
+        mujer = fuente.consultar("punto6_provincia_con_mas_confirmados", ("F",))
+        hombre = fuente.consultar("punto6_provincia_con_mas_confirmados", ("M",))
+
     # Mujeres
-    cur.execute("""
-        SELECT residencia_provincia_nombre, COUNT(*) AS cantidad
-        FROM casos
-        WHERE TRIM(sexo) = 'F'
-        AND LOWER(clasificacion) LIKE '%confirmado%'
-        GROUP BY residencia_provincia_nombre
-        ORDER BY cantidad DESC
-        LIMIT 1
-    """)
-    mujer = cur.fetchone()
     if mujer:
-        print(f"👩 Provincia con más casos confirmados en mujeres: {mujer[0]} ({mujer[1]} casos)")
+        print(f"👩 Provincia con más casos confirmados en mujeres: {mujer[0][0]} ({mujer[0][1]} casos)")
     else:
         print("❌ No se encontraron casos confirmados en mujeres.")
 
     # Hombres
-    cur.execute("""
-        SELECT residencia_provincia_nombre, COUNT(*) AS cantidad
-        FROM casos
-        WHERE TRIM(sexo) = 'M'
-        AND LOWER(clasificacion) LIKE '%confirmado%'
-        GROUP BY residencia_provincia_nombre
-        ORDER BY cantidad DESC
-        LIMIT 1
-    """)
-    hombre = cur.fetchone()
     if hombre:
-        print(f"🧔 Provincia con más casos confirmados en hombres: {hombre[0]} ({hombre[1]} casos)")
+        print(f"🧔 Provincia con más casos confirmados en hombres: {hombre[0][0]} ({hombre[0][1]} casos)")
     else:
         print("❌ No se encontraron casos confirmados en hombres.")
 
-    conn.close()
-
-
-def punto7_menor_proporcion_confirmados_sobre_poblacion():
-    import csv
-
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
 
+@perfilado
+def punto7_menor_proporcion_confirmados_sobre_poblacion(fuente=None):
     print("\n Punto 7: Menor proporción de casos confirmados respecto al Censo 2022")
 
-    # Leer archivo del censo
-    poblacion = {}
-    try:
-        with open("censo2022.csv", encoding="utf-8") as archivo:
-            lector = csv.DictReader(archivo)
-            for fila in lector:
-                provincia = fila["provincia"].strip()
-                poblacion[provincia] = int(fila["poblacion"])
-    except FileNotFoundError:
-        print("❌ Archivo censo2022.csv no encontrado.")
+    if not os.path.exists(RUTA_CENSO):
+        print(f"❌ Archivo {RUTA_CENSO} no encontrado.")
         return
 
-    # Obtener casos confirmados por provincia
-    cur.execute("""
-        SELECT residencia_provincia_nombre, COUNT(*) AS cantidad
-        FROM casos
-        WHERE LOWER(clasificacion) LIKE '%confirmado%'
-        GROUP BY residencia_provincia_nombre
-    """)
+    # Casos confirmados y población de cada provincia, ya cruzados con el censo
+    with abrir_fuente(fuente) as fuente:
+        confirmados = fuente.consultar("censo_confirmados_por_provincia")
 
     datos = []
-    for prov, casos in cur.fetchall():
-        prov_normalizado = prov.strip()
-        if prov_normalizado in poblacion:
-            pob = poblacion[prov_normalizado]
+    for prov, casos, pob in confirmados:
+        if pob:
             proporcion = (casos / pob) * 100
-            datos.append((prov_normalizado, casos, pob, proporcion))
+            datos.append((prov, casos, pob, proporcion))
         else:
-            print(f"⚠️ Provincia no encontrada en censo: {prov_normalizado}")
+            print(f"⚠️ Provincia no encontrada en censo: {prov}")
 
     # Ordenar por menor proporción
     datos.sort(key=lambda x: x[3])  # por porcentaje
@@ -383,47 +1519,27 @@ def punto7_menor_proporcion_confirmados_sobre_poblacion():
         print(f"{prov:<25} {casos:>10} {pob:>12} {prop:>14.2f} %")
 
     print(f"\n✔️ Provincia con menor proporción: {datos[0][0]} ({datos[0][3]:.2f} %)")
-    conn.close()
-
 
-def punto8_proporcion_fallecidos_sobre_poblacion():
-    import csv
-
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
 
+@perfilado
+def punto8_proporcion_fallecidos_sobre_poblacion(fuente=None):
     print("\n Punto 8: Provincia con mayor proporción de fallecidos sobre la población (Censo 2022)")
 
-    # Leer archivo censo
-    poblacion = {}
-    try:
-        with open("censo2022.csv", encoding="utf-8") as archivo:
-            lector = csv.DictReader(archivo)
-            for fila in lector:
-                provincia = fila["provincia"].strip()
-                poblacion[provincia] = int(fila["poblacion"])
-    except FileNotFoundError:
-        print("❌ Archivo censo2022.csv no encontrado.")
+    if not os.path.exists(RUTA_CENSO):
+        print(f"❌ Archivo {RUTA_CENSO} no encontrado.")
         return
 
-    # Obtener cantidad de fallecidos confirmados por provincia
-    cur.execute("""
-        SELECT residencia_provincia_nombre, COUNT(*) AS fallecidos
-        FROM casos
-        WHERE TRIM(UPPER(fallecido)) = 'SI'
-        AND LOWER(clasificacion) LIKE '%confirmado%'
-        GROUP BY residencia_provincia_nombre
-    """)
+    # Fallecidos confirmados y población de cada provincia, ya cruzados con el censo
+    with abrir_fuente(fuente) as fuente:
+        fallecidos_por_provincia = fuente.consultar("censo_fallecidos_por_provincia")
 
     datos = []
-    for prov, fallecidos in cur.fetchall():
-        prov_normalizado = prov.strip()
-        if prov_normalizado in poblacion:
-            pob = poblacion[prov_normalizado]
+    for prov, fallecidos, pob in fallecidos_por_provincia:
+        if pob:
             porcentaje = (fallecidos / pob) * 100
-            datos.append((prov_normalizado, fallecidos, pob, porcentaje))
+            datos.append((prov, fallecidos, pob, porcentaje))
         else:
-            print(f"⚠️ Provincia no encontrada en censo: {prov_normalizado}")
+            print(f"⚠️ Provincia no encontrada en censo: {prov}")
 
     # Ordenar de mayor a menor proporción
     datos.sort(key=lambda x: x[3], reverse=True)
@@ -435,48 +1551,26 @@ def punto8_proporcion_fallecidos_sobre_poblacion():
         print(f"{prov:<30} {f:>10} {p:>12} {porc:>14.2f} %")
 
     print(f"\n✔️ Provincia con mayor proporción: {datos[0][0]} ({datos[0][3]:.2f} %)")
-    conn.close()
 
 
-def punto9_indice_confirmados_por_sexo():
-    import csv
-
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
-
+@perfilado
+def punto9_indice_confirmados_por_sexo(fuente=None):
     print("\n Punto 9: Índice de casos confirmados por sexo (según Censo 2022)")
 
-    # Leer el censo con datos por provincia y sexo
-    poblacion = {}  # clave: (provincia, sexo) → valor: población
-    try:
-        with open("censo2022.csv", encoding="utf-8") as archivo:
-            lector = csv.DictReader(archivo)
-            for fila in lector:
-                prov = fila["provincia"].strip()
-                sexo = fila["sexo"].strip().upper()
-                pob = int(fila["poblacion"])
-                poblacion[(prov, sexo)] = pob
-    except FileNotFoundError:
-        print("❌ Archivo censo2022.csv no encontrado.")
+    if not os.path.exists(RUTA_CENSO):
+        print(f"❌ Archivo {RUTA_CENSO} no encontrado.")
         return
 
-    # Contar confirmados por provincia y sexo desde la base de datos
-    cur.execute("""
-        SELECT residencia_provincia_nombre, TRIM(UPPER(sexo)) AS sexo, COUNT(*) AS cantidad
-        FROM casos
-        WHERE LOWER(clasificacion) LIKE '%confirmado%'
-        AND sexo IN ('F', 'M')
-        GROUP BY residencia_provincia_nombre, sexo
-    """)
+    # Confirmados y población por provincia y sexo, ya cruzados con el censo
+    with abrir_fuente(fuente) as fuente:
+        confirmados = fuente.consultar("censo_confirmados_por_provincia_y_sexo")
 
     # Agrupar los datos
     datos = {}
     total_confirmados = {"F": 0, "M": 0}
     total_poblacion = {"F": 0, "M": 0}
 
-    for prov, sexo, cant in cur.fetchall():
-        clave = (prov.strip(), sexo)
-        pob = poblacion.get(clave)
+    for prov, sexo, cant, pob in confirmados:
         if pob:
             indice = (cant / pob) * 100
             if prov not in datos:
@@ -486,7 +1580,7 @@ def punto9_indice_confirmados_por_sexo():
             total_confirmados[sexo] += cant
             total_poblacion[sexo] += pob
         else:
-            print(f"⚠️ Faltan datos del censo para: {clave}")
+            print(f"⚠️ Faltan datos del censo para: {(prov, sexo)}")
 
     # Mostrar tabla por provincia
     print(f"\n{'Provincia':<20} {'Conf. F':>8} {'Pob. F':>9} {'% F':>8} | {'Conf. M':>8} {'Pob. M':>9} {'% M':>8}")
@@ -514,58 +1608,797 @@ def punto9_indice_confirmados_por_sexo():
     else:
         print("\n✔️ Índice igual en ambos sexos.")
 
-    conn.close()
 
+# Tasas cada 100.000 habitantes de confirmados y fallecidos, por provincia y por sexo
+@perfilado
+def tasas_por_100k(fuente=None):
+    print("\n📈 Tasas cada 100.000 habitantes (Censo 2022)")
 
+    if not os.path.exists(RUTA_CENSO):
+        print(f"❌ Archivo {RUTA_CENSO} no encontrado.")
+        return
 
-def ver_valores_clasificacion():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
+    with abrir_fuente(fuente) as fuente:
+        confirmados = fuente.consultar("censo_confirmados_por_provincia")
+        fallecidos = {prov: casos for prov, casos, _ in fuente.consultar("censo_fallecidos_por_provincia")}
+        confirmados_sexo = fuente.consultar("censo_confirmados_por_provincia_y_sexo")
+        fallecidos_sexo = {(prov, sexo): casos for prov, sexo, casos, _ in fuente.consultar("censo_fallecidos_por_provincia_y_sexo")}
+
+    print(f"\n{'Provincia':<25} {'Población':>12} {'Confirmados':>12} {'Conf./100k':>11} {'Fallecidos':>11} {'Fall./100k':>11}")
+    print("-" * 87)
+    for prov, casos, pob in sorted(confirmados, key=lambda fila: fila[0]):
+        if not pob:
+            print(f"⚠️ Provincia no encontrada en censo: {prov}")
+            continue
+        muertes = fallecidos.get(prov, 0)
+        print(f"{prov:<25} {pob:>12} {casos:>12} {casos / pob * 100000:>11.1f} {muertes:>11} {muertes / pob * 100000:>11.1f}")
+
+    # Por sexo, sumando solo las provincias que están en el censo
+    totales = {}
+    for prov, sexo, casos, pob in confirmados_sexo:
+        if pob:
+            conf, muertes, poblacion = totales.get(sexo, (0, 0, 0))
+            totales[sexo] = (conf + casos, muertes + fallecidos_sexo.get((prov, sexo), 0), poblacion + pob)
+    print(f"\n{'Sexo':<25} {'Población':>12} {'Confirmados':>12} {'Conf./100k':>11} {'Fallecidos':>11} {'Fall./100k':>11}")
+    print("-" * 87)
+    for sexo, (casos, muertes, pob) in sorted(totales.items()):
+        print(f"{sexo:<25} {pob:>12} {casos:>12} {casos / pob * 100000:>11.1f} {muertes:>11} {muertes / pob * 100000:>11.1f}")
+
+
+# Tablero por departamento: los que más confirmados tienen y los de mayor proporción
+# de fallecidos y de asistencia respiratoria mecánica entre sus confirmados. Para las
+# proporciones solo se tienen en cuenta departamentos con una cantidad mínima de
+# confirmados, así un departamento con 2 casos y 1 fallecido no encabeza la tabla.
+TOP_DEPARTAMENTOS = 10
+MINIMO_CONFIRMADOS_TASA = 30
+
+@perfilado
+def tablero_departamentos(fuente=None, top=TOP_DEPARTAMENTOS, minimo=MINIMO_CONFIRMADOS_TASA):
+    print("\n🏘️ Tablero por departamento (casos confirmados)")
+
+    inicio = time.perf_counter()
+    with abrir_fuente(fuente) as fuente:
+        filas = fuente.consultar("departamentos_confirmados")
+    if not filas:
+        print("❌ No hay casos confirmados con departamento.")
+        return
 
-    cur.execute("""
-        SELECT DISTINCT clasificacion FROM casos
-        WHERE clasificacion IS NOT NULL AND clasificacion != ''
-    """)
-    valores = cur.fetchall()
+    # (provincia, departamento, confirmados, % fallecidos, % ARM)
+    datos = [(provincia or "-", departamento, confirmados, fallecidos / confirmados * 100, arm / confirmados * 100)
+             for provincia, departamento, confirmados, fallecidos, arm in filas if confirmados]
+    con_minimo = [fila for fila in datos if fila[2] >= minimo]
+    # Los empates se ordenan por provincia y departamento, para que el orden sea estable
+    tablas = [
+        ("Más confirmados", sorted(datos, key=lambda fila: (-fila[2], fila[:2]))),
+        (f"Mayor % de fallecidos (con {minimo} o más confirmados)", sorted(con_minimo, key=lambda fila: (-fila[3], fila[:2]))),
+        (f"Mayor % con asistencia respiratoria mecánica (con {minimo} o más confirmados)", sorted(con_minimo, key=lambda fila: (-fila[4], fila[:2]))),
+    ]
+    for titulo, filas_tabla in tablas:
+        print(f"\n🔸 {titulo}")
+        print(f"{'Provincia':<20} {'Departamento':<25} {'Confirmados':>11} {'% Fallecidos':>13} {'% ARM':>7}")
+        print("-" * 80)
+        for provincia, departamento, confirmados, porcentaje_fallecidos, porcentaje_arm in filas_tabla[:top]:
+            print(f"{provincia:<20} {departamento:<25} {confirmados:>11} {porcentaje_fallecidos:>12.2f}% {porcentaje_arm:>6.2f}%")
+
+    print(f"\n✅ {len(datos)} departamentos en {time.perf_counter() - inicio:.3f} s.")
+
+@perfilado
+def serie_temporal(fuente=None):
+    print("\n📅 Serie temporal de casos confirmados y fallecidos por fecha de diagnóstico")
+
+    inicio = time.perf_counter()
+    with abrir_fuente(fuente) as fuente:
+        filas = fuente.consultar("serie_diaria_por_provincia")
+    fecha_inicio, dias, series = armar_series(filas)
+    if not dias:
+        print("❌ No hay casos con fecha de diagnóstico.")
+        return
 
-    print("\n🔍 Valores únicos en la columna 'clasificacion':")
-    for v in valores:
-        print(f"- '{v[0]}'")
-    conn.close()
+    resultados = []
+    for provincia, (confirmados, fallecidos) in series.items():
+        medias = {ventana: media_movil(confirmados, ventana) for ventana in VENTANAS_MOVILES}
+        crecimiento = tasa_crecimiento(confirmados, 7)[-1]
+        # Los primeros días no tienen la ventana completa y no cuentan como pico
+        picos = detectar_picos(medias[7], desde=6)
+        pico = max(picos, key=lambda dia: medias[7][dia], default=None)
+        resultados.append((provincia, sum(confirmados), sum(fallecidos), medias, crecimiento, picos, pico))
+    segundos = time.perf_counter() - inicio
+
+    fecha = lambda dia: (fecha_inicio + datetime.timedelta(days=dia)).isoformat()
+    print(f"Del {fecha(0)} al {fecha(dias - 1)} ({dias} días)")
+    print(f"\n{'Provincia':<22} {'Confirmados':>11} {'Fallecidos':>10} {'Media 7d':>9} {'Media 14d':>10} "
+          f"{'Crec. 7d':>9} {'Pico (media 7d)':>22} {'Picos':>6}")
+    print("-" * 106)
+    for provincia, confirmados, fallecidos, medias, crecimiento, picos, pico in resultados:
+        texto_crecimiento = "-" if crecimiento is None else f"{crecimiento * 100:+.1f}%"
+        texto_pico = "-" if pico is None else f"{fecha(pico)} ({medias[7][pico]:.1f})"
+        print(f"{provincia:<22} {confirmados:>11} {fallecidos:>10} {medias[7][-1]:>9.1f} {medias[14][-1]:>10.1f} "
+              f"{texto_crecimiento:>9} {texto_pico:>22} {len(picos):>6}")
+
+    _, _, medias, _, picos, _ = resultados[-1][1:]
+    print(f"\n📈 Picos del total país (media móvil de 7 días): "
+          f"{', '.join(f'{fecha(dia)} ({medias[7][dia]:.1f})' for dia in picos) or '-'}")
+    print(f"✅ {len(series) - 1} provincias × {dias} días calculados en {segundos:.2f} s.")
+
+
+# Estimaciones sobre la muestra estratificada. "estratos" es una lista de
+# (población del estrato, filas de la muestra): cada estrato pesa según su
+# población. Devuelven la estimación y la mitad del intervalo de confianza del 95 %.
+Z_95 = 1.96
+
+def estimar_total(estratos, y):
+    total = 0.0
+    varianza = 0.0
+    for poblacion, filas in estratos:
+        n = len(filas)
+        if not n:
+            continue
+        valores = [y(fila) for fila in filas]
+        media = sum(valores) / n
+        total += poblacion * media
+        if n > 1:
+            s2 = sum((valor - media) ** 2 for valor in valores) / (n - 1)
+            # Con corrección por población finita: un estrato muestreado entero no tiene error
+            varianza += poblacion ** 2 * (1 - n / poblacion) * s2 / n
+    return total, Z_95 * math.sqrt(varianza)
+
+# Razón entre dos totales (un promedio o una proporción dentro de un grupo). La
+# varianza sale por linealización: la del total de y - razón * x, sobre el total de x.
+def estimar_razon(estratos, y, x):
+    total_y, _ = estimar_total(estratos, y)
+    total_x, _ = estimar_total(estratos, x)
+    if not total_x:
+        return None, None
+    razon = total_y / total_x
+    _, error = estimar_total(estratos, lambda fila: y(fila) - razon * x(fila))
+    return razon, error / total_x
+
+# Vista rápida de todo el dataset solo con los bosquejos y la muestra: valores
+# distintos y más frecuentes de cada variable, y algunas estimaciones de los
+# reportes con su intervalo de confianza. Los números finales, con el modo exacto.
+@perfilado
+def exploracion_aproximada():
+    print("\n⚡ Exploración aproximada (bosquejos y muestra estratificada, IC del 95 %)")
+
+    inicio = time.perf_counter()
+    with obtener_sesion().conexion() as conn:
+        try:
+            bosquejos = conn.execute("SELECT variable, tipo, parametros, datos FROM bosquejos").fetchall()
+            estratos = leer_muestra(conn)
+        except sqlite3.OperationalError:
+            print("❌ La base no tiene bosquejos. Ejecute 'Crear tabla SQL' y vuelva a cargar los datos.")
+            return
+        if not estratos:
+            print("❌ No hay datos cargados.")
+            return
+        nombres = {var: nombres_valores(conn, var) for var, _, _ in VARIABLES}
+        confirmados = {id_ for id_, in conn.execute("SELECT id FROM clasificaciones WHERE confirmado = 1")}
+
+    clasificaciones = {var: clasificacion for var, _, clasificacion in VARIABLES}
+    distintos = {}
+    frecuentes = {}
+    for var, tipo, parametros, datos in bosquejos:
+        parametros = json.loads(parametros)
+        if tipo == "hll":
+            hll = HyperLogLog(parametros["precision"], datos)
+            estimado = hll.estimar()
+            distintos[var] = (estimado, hll.error(estimado))
+        else:
+            frecuentes[var] = [(texto_valor(valor, nombres[var], clasificaciones[var]), cantidad)
+                               for valor, cantidad in parametros["candidatos"][:3]]
+            error_conteo = parametros["epsilon"] * parametros["total"]
+
+    print(f"\n{'Variable':<33} {'Distintos':>15}   Más frecuentes (≈ casos)")
+    print("-" * 110)
+    for var, _, _ in VARIABLES:
+        estimado, error = distintos[var]
+        texto_frecuentes = ", ".join(f"{texto} ({cantidad})" for texto, cantidad in frecuentes[var])
+        print(f"{var:<33} {f'{estimado:.0f} ± {error:.0f}':>15}   {texto_frecuentes}")
+    print(f"(los conteos pueden estar pasados en hasta {error_conteo:.0f} casos; "
+          f"los departamentos se cuentan por provincia)")
+
+    lista = list(estratos.values())
+    edad = COLUMNAS_CASOS.index("edad")
+    fallecido = COLUMNAS_CASOS.index("fallecido")
+    clasificacion = COLUMNAS_CASOS.index("clasificacion_id")
+    fallecido_con_edad = lambda fila: fila[fallecido] == 1 and fila[edad] is not None
+
+    sin_edad, error_sin_edad = estimar_razon(lista, lambda fila: fila[edad] is None, lambda fila: 1)
+    print(f"\n📌 Registros sin edad: {sin_edad * 100:.2f} % ± {error_sin_edad * 100:.2f}")
+    promedio, error_promedio = estimar_razon(lista, lambda fila: fila[edad] if fallecido_con_edad(fila) else 0,
+                                             fallecido_con_edad)
+    if promedio is not None:
+        print(f"📌 Edad promedio de los fallecidos: {promedio:.2f} ± {error_promedio:.2f} años")
+
+    provincias = nombres["residencia_provincia_nombre"]
+    print(f"\n{'Provincia':<25} {'Confirmados (≈)':>22}")
+    print("-" * 48)
+    for provincia_id in sorted({provincia_id for provincia_id, _ in estratos}, key=lambda id_: str(provincias.get(id_))):
+        del_estrato = [estrato for (id_, _), estrato in estratos.items() if id_ == provincia_id]
+        total, error = estimar_total(del_estrato, lambda fila: fila[clasificacion] in confirmados)
+        print(f"{str(provincias.get(provincia_id)):<25} {f'{total:.0f} ± {error:.0f}':>22}")
+
+    muestra = sum(len(filas) for _, filas in lista)
+    poblacion = sum(poblacion for poblacion, _ in lista)
+    segundos = time.perf_counter() - inicio
+    print(f"\n✅ Muestra de {muestra} filas de {poblacion} ({len(lista)} estratos provincia × sexo), "
+          f"calculado en {segundos * 1000:.0f} ms.")
+
+# Los nueve reportes en orden, para ejecutarlos todos juntos
+PUNTOS = [
+    punto1_describir_variables,
+    punto2_edad_faltante,
+    punto3_promedio_edad_fallecidos,
+    punto4_sturges_intervalos,
+    punto5_mujeres_hombres_fallecidos_por_intervalo,
+    punto6_confirmados_por_provincia_y_sexo,
+    punto7_menor_proporcion_confirmados_sobre_poblacion,
+    punto8_proporcion_fallecidos_sobre_poblacion,
+    punto9_indice_confirmados_por_sexo,
+]
+
+# Un grupo del resumen: cuántos casos hay con esta combinación de valores
+Grupo = collections.namedtuple("Grupo", "provincia sexo clasificacion confirmado edad fallecido cantidad")
+
+# Resumen en memoria: los grupos del cubo más los valores distintos de las columnas
+# que solo aparecen en el punto 1. Responde las mismas consultas que FuenteSQLite.
+class Resumen:
+    def __init__(self, grupos, valores):
+        self.grupos = grupos
+        self.valores_por_variable = valores
+
+    @classmethod
+    def desde_sqlite(cls, conn):
+        provincias = dict(conn.execute("SELECT id, nombre FROM provincias"))
+        sexos = dict(conn.execute("SELECT id, codigo FROM sexos"))
+        clasificaciones = {id_: (nombre, confirmado) for id_, nombre, confirmado
+                           in conn.execute("SELECT id, nombre, confirmado FROM clasificaciones")}
+        grupos = []
+        for provincia_id, sexo_id, clasificacion_id, edad, fallecido, cantidad in ejecutar_sql(conn, "cubo", "SELECT * FROM cubo"):
+            clasificacion, confirmado = clasificaciones.get(clasificacion_id, (None, 0))
+            grupos.append(Grupo(provincias.get(provincia_id), sexos.get(sexo_id), clasificacion,
+                                confirmado, edad, fallecido, cantidad))
+
+        # Valores distintos para el punto 1, en el orden en que aparecen (salen del
+        # perfil de calidad, sin recorrer casos)
+        valores = {
+            var: valores_perfil(ejecutar_sql(conn, f"valores_{var}", CONSULTAS["valores"], (var,)), clasificacion)
+            for var, _, clasificacion in VARIABLES if var != "edad"
+        }
+        return cls(grupos, valores)
+
+    # Arma el resumen directamente desde filas normalizadas (sin base de datos).
+    # Solo guarda un contador por combinación de valores y los valores distintos,
+    # así que la memoria no depende de la cantidad de filas.
+    @classmethod
+    def desde_filas(cls, filas):
+        si_no = {1: "SI", 0: "NO"}
+        conteo = collections.Counter()
+        valores = {var: {} for var, _, _ in VARIABLES if var != "edad"}
+        variables = list(valores.items())
+        for fila in filas:
+            (sexo, edad, _, _, provincia, _, _, fallecido, _, _, clasificacion, _) = fila
+            conteo[provincia, sexo, clasificacion, edad, fallecido] += 1
+            for (var, vistos), valor in zip(variables, fila[:1] + fila[2:]):
+                if valor is not None and valor not in vistos:
+                    vistos[valor] = True
+
+        grupos = [
+            Grupo(provincia, sexo, clasificacion, int(clasificacion is not None and es_confirmado(clasificacion)),
+                  edad, fallecido, cantidad)
+            for (provincia, sexo, clasificacion, edad, fallecido), cantidad in conteo.items()
+        ]
+        for var in ("fallecido", "asistencia_respiratoria_mecanica"):
+            valores[var] = dict.fromkeys(si_no[v] for v in valores[var])
+        return cls(grupos, {var: list(v) for var, v in valores.items()})
+
+    # Para guardarlo en la caché
+    def a_json(self):
+        return {"grupos": [list(g) for g in self.grupos], "valores": self.valores_por_variable}
+
+    @classmethod
+    def desde_json(cls, datos):
+        return cls([Grupo(*g) for g in datos["grupos"]], datos["valores"])
+
+    def valores(self, var, clasificacion):
+        return self.valores_por_variable[var]
+
+    def consultar(self, nombre, parametros=()):
+        return getattr(self, nombre)(*parametros)
+
+    # Suma las cantidades de los grupos que cumplen la condición, por clave
+    def contar(self, clave, condicion):
+        conteo = {}
+        for grupo in self.grupos:
+            if condicion(grupo):
+                k = clave(grupo)
+                conteo[k] = conteo.get(k, 0) + grupo.cantidad
+        return conteo
+
+    def punto1_rango_edad(self):
+        edades = [g.edad for g in self.grupos if g.edad is not None]
+        return [(min(edades, default=None), max(edades, default=None))]
+
+    def punto2_total(self):
+        return [(sum(g.cantidad for g in self.grupos),)]
+
+    def punto2_sin_edad(self):
+        return [(sum(g.cantidad for g in self.grupos if g.edad is None),)]
+
+    # El resumen solo tiene los valores normalizados: no sabe cuáles no se pudieron leer
+    def punto2_edad_invalida(self):
+        return [(None,)]
+
+    def calidad(self):
+        return []
+
+    def calidad_rechazadas(self):
+        return [(0,)]
+
+    def punto3_promedio_por_provincia(self):
+        condicion = lambda g: g.fallecido == 1 and g.edad is not None and g.provincia is not None
+        casos = self.contar(lambda g: g.provincia, condicion)
+        suma = {}
+        for g in self.grupos:
+            if condicion(g):
+                suma[g.provincia] = suma.get(g.provincia, 0) + g.edad * g.cantidad
+        return [(provincia, suma[provincia] / casos[provincia]) for provincia in sorted(casos)]
+
+    def punto3_frecuencia_edades_fallecidos(self):
+        conteo = self.contar(lambda g: g.edad, lambda g: g.fallecido == 1 and g.edad is not None)
+        return sorted(conteo.items())
+
+    def frecuencia_edades_fallecidos_por_provincia(self):
+        conteo = self.contar(lambda g: (g.provincia, g.edad),
+                             lambda g: g.fallecido == 1 and g.edad is not None and g.provincia is not None)
+        return [(provincia, edad, n) for (provincia, edad), n in sorted(conteo.items())]
+
+    def frecuencia_edades_fallecidos_por_sexo(self):
+        conteo = self.contar(lambda g: (g.sexo, g.edad),
+                             lambda g: g.fallecido == 1 and g.edad is not None and g.sexo is not None)
+        return [(sexo, edad, n) for (sexo, edad), n in sorted(conteo.items())]
+
+    def punto4_frecuencia_edades_confirmados(self):
+        conteo = self.contar(lambda g: g.edad,
+                             lambda g: g.confirmado and g.edad is not None and 0 <= g.edad <= 120)
+        return sorted(conteo.items())
+
+    def punto5_frecuencia_mujeres_fallecidas(self):
+        conteo = self.contar(lambda g: g.edad,
+                             lambda g: g.sexo == "F" and g.fallecido == 1 and g.edad is not None and 0 <= g.edad <= 120)
+        return list(conteo.items())
+
+    def punto5_frecuencia_hombres(self):
+        condicion = lambda g: g.sexo == "M" and g.edad is not None and 0 <= g.edad <= 120
+        totales = self.contar(lambda g: g.edad, condicion)
+        fallecidos = self.contar(lambda g: g.edad, lambda g: condicion(g) and g.fallecido == 1)
+        return [(edad, total, fallecidos.get(edad, 0)) for edad, total in totales.items()]
+
+    def punto6_provincia_con_mas_confirmados(self, sexo):
+        conteo = self.contar(lambda g: g.provincia,
+                             lambda g: g.sexo == sexo and g.confirmado and g.provincia is not None)
+        if not conteo:
+            return []
+        return [max(conteo.items(), key=lambda item: item[1])]
+
+    def censo_confirmados_por_provincia(self):
+        return unir_censo(self.contar(lambda g: g.provincia,
+                                      lambda g: g.confirmado and g.provincia is not None))
+
+    def censo_fallecidos_por_provincia(self):
+        return unir_censo(self.contar(lambda g: g.provincia,
+                                      lambda g: g.confirmado and g.fallecido == 1 and g.provincia is not None))
+
+    def censo_confirmados_por_provincia_y_sexo(self):
+        return unir_censo(self.contar(lambda g: (g.provincia, g.sexo),
+                                      lambda g: g.confirmado and g.sexo in ("F", "M") and g.provincia is not None))
+
+    def censo_fallecidos_por_provincia_y_sexo(self):
+        return unir_censo(self.contar(lambda g: (g.provincia, g.sexo),
+                                      lambda g: g.confirmado and g.fallecido == 1 and g.sexo in ("F", "M")
+                                      and g.provincia is not None))
+
+# Arma el resumen desde covid.db (o desde la caché si los datos no cambiaron)
+@perfilado
+def resumen_sqlite():
+    sesion = obtener_sesion()
+    with sesion.conexion() as conn:
+        if sesion.cache is None:
+            return Resumen.desde_sqlite(conn)
+        datos = con_cache(sesion.cache, huella_datos(conn), "resumen",
+                          lambda: Resumen.desde_sqlite(conn).a_json())
+        return Resumen.desde_json(datos)
+
+# Ejecuta los nueve reportes leyendo la tabla casos una sola vez
+@perfilado
+def ejecutar_todos():
+    inicio = time.perf_counter()
+    if ALMACEN == "parquet":
+        resumen = FuenteParquet()
+        resumen.precalcular()
+    else:
+        resumen = resumen_sqlite()
+    segundos = time.perf_counter() - inicio
 
+    for punto in PUNTOS:
+        punto(resumen)
 
-def diagnostico_confirmados_por_sexo():
-    conn = sqlite3.connect("covid.db")
-    cur = conn.cursor()
+    print(f"\n✅ Resumen calculado en una sola pasada: {len(resumen.grupos)} grupos en {segundos:.2f} s.")
 
-    print("\n🔎 Diagnóstico de la tabla 'casos'")
+# Corre varios reportes a la vez, cada uno en un hilo con su propia conexión del
+# pool de la sesión (SQLite suelta el GIL mientras ejecuta una consulta). Lo que
+# imprime cada reporte se junta aparte y se muestra en el orden de la lista, igual
+# que si se hubieran corrido de a uno; el total tarda más o menos lo que el reporte
+# más lento.
+HILOS_REPORTES = MAXIMO_CONEXIONES
 
-    # Ver sexo
-    print("\n📌 Valores únicos en 'sexo':")
-    cur.execute("SELECT sexo, COUNT(*) FROM casos GROUP BY sexo")
-    for fila in cur.fetchall():
-        print(f"- {repr(fila[0])}: {fila[1]} registros")
+# Reemplaza a sys.stdout mientras corren los reportes: cada hilo escribe en su buffer
+class SalidaPorHilo(io.TextIOBase):
+    def __init__(self, original):
+        self.original = original
+        self.hilo = threading.local()
 
-    # Ver clasificaciones que contienen 'confirmado'
-    print("\n📌 Clasificaciones que contienen 'confirmado':")
-    cur.execute("SELECT clasificacion, COUNT(*) FROM casos WHERE LOWER(clasificacion) LIKE '%confirmado%' GROUP BY clasificacion")
-    for fila in cur.fetchall():
-        print(f"- {repr(fila[0])}: {fila[1]} registros")
+    def write(self, texto):
+        buffer = getattr(self.hilo, "buffer", None)
+        return (buffer or self.original).write(texto)
 
-    # Ver cantidad de casos confirmados por sexo
-    print("\n📌 Casos confirmados por sexo:")
-    cur.execute("""
-        SELECT sexo, COUNT(*) FROM casos
-        WHERE LOWER(clasificacion) LIKE '%confirmado%'
-        GROUP BY sexo
-    """)
-    for fila in cur.fetchall():
-        print(f"- {repr(fila[0])}: {fila[1]} casos confirmados")
+    def flush(self):
+        self.original.flush()
 
-    conn.close()
+def correr_capturado(salida, punto):
+    salida.hilo.buffer = io.StringIO()
+    inicio = time.perf_counter()
+    try:
+        punto()
+    except Exception as error:
+        print(f"❌ {punto.__name__} falló: {error}")
+    finally:
+        texto = salida.hilo.buffer.getvalue()
+        salida.hilo.buffer = None
+    return texto, time.perf_counter() - inicio
+
+@perfilado
+def ejecutar_en_paralelo(puntos=None, hilos=None):
+    import concurrent.futures
+
+    puntos = puntos or PUNTOS
+    inicio = time.perf_counter()
+    salida = SalidaPorHilo(sys.stdout)
+    with contextlib.redirect_stdout(salida), en_paralelo():
+        with concurrent.futures.ThreadPoolExecutor(hilos or HILOS_REPORTES) as ejecutor:
+            resultados = list(ejecutor.map(functools.partial(correr_capturado, salida), puntos))
+    segundos = time.perf_counter() - inicio
+
+    for texto, _ in resultados:
+        print(texto, end="")
+
+    mas_lento = max(resultados, key=lambda resultado: resultado[1])[1]
+    suma = sum(tiempo for _, tiempo in resultados)
+    print(f"\n✅ {len(puntos)} reportes en paralelo en {segundos:.2f} s "
+          f"(el más lento tardó {mas_lento:.2f} s; la suma de todos es {suma:.2f} s).")
+
+# Modo directo: los nueve reportes en una sola lectura del CSV (o de una copia
+# comprimida .csv.gz), sin crear covid.db. Sirve para consultas puntuales sobre un
+# archivo recién descargado.
+@perfilado
+def analizar_csv(ruta=None, tamano_lote=None, ruta_rechazos=RUTA_RECHAZOS):
+    ruta = ruta or RUTA_CSV
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    if not os.path.exists(ruta) and os.path.exists(ruta + ".gz"):
+        ruta += ".gz"
+
+    inicio = time.perf_counter()
+    with open(ruta_rechazos, "w", encoding="utf-8", newline="") as archivo_rechazos:
+        rechazos = csv.writer(archivo_rechazos)
+        lotes = leer_lotes_csv(ruta, tamano_lote, rechazos)
+        resumen = Resumen.desde_filas(fila for lote, _ in lotes for fila in lote)
+    segundos = time.perf_counter() - inicio
+
+    for punto in PUNTOS:
+        punto(resumen)
+
+    print(f"\n✅ {os.path.basename(ruta)} analizado sin base de datos: {len(resumen.grupos)} grupos en {segundos:.2f} s.")
+
+
+# Los reportes pueden leer de un dataset Parquet en lugar de covid.db (ver almacen_parquet)
+ALMACEN = "sqlite"  # "sqlite" o "parquet": de dónde leen los reportes
+
+# Lee el CSV una vez y lo guarda como dataset Parquet particionado por provincia
+@perfilado
+def convertir_a_parquet(ruta_destino=RUTA_PARQUET, tamano_lote=None, ruta_rechazos=RUTA_RECHAZOS):
+    tamano_lote = tamano_lote or TAMANO_LOTE
+    pa = importar_pyarrow()
+    if pa is None:
+        return
+
+    inicio = time.perf_counter()
+    total = 0
+    rechazadas = 0
+    with open(ruta_rechazos, "w", encoding="utf-8", newline="") as archivo_rechazos:
+        rechazos = csv.writer(archivo_rechazos)
+
+        def lotes():
+            nonlocal total, rechazadas
+            for lote, rechazadas_lote in leer_lotes_csv(RUTA_CSV, tamano_lote, rechazos):
+                rechazadas += rechazadas_lote
+                if lote:
+                    total += len(lote)
+                    yield lote
+
+        escribir_parquet(pa, lotes(), ruta_destino)
+
+    segundos = time.perf_counter() - inicio
+    tamano = sum(os.path.getsize(os.path.join(raiz, nombre))
+                 for raiz, _, nombres in os.walk(ruta_destino) for nombre in nombres)
+    print(f"✅ CSV convertido a Parquet en {ruta_destino}: {total} filas, {tamano / 1024 / 1024:.1f} MB en {segundos:.2f} s.")
+    if rechazadas:
+        print(f"⚠️ {rechazadas} filas sin 12 columnas guardadas en {ruta_rechazos}.")
+
+# Fuente de datos sobre el dataset Parquet. Responde las mismas consultas que el
+# Resumen; los grupos se calculan la primera vez que se piden leyendo solo las
+# columnas que usan los reportes, y los valores del punto 1 solo si se piden.
+class FuenteParquet(Resumen):
+    def __init__(self, ruta=RUTA_PARQUET):
+        self.parquet = DatasetParquet(ruta, TAMANO_LOTE)
+        self._grupos = None
+        self._valores = None
+
+    @property
+    def grupos(self):
+        if self._grupos is None:
+            self._grupos = [Grupo(*grupo) for grupo in self.parquet.grupos()]
+        return self._grupos
+
+    @property
+    def valores_por_variable(self):
+        if self._valores is None:
+            self._valores = self.parquet.valores([var for var, _, _ in VARIABLES if var != "edad"])
+        return self._valores
+
+    # Lee ya los grupos y los valores, que si no se leen la primera vez que un reporte
+    # los pide. Así ejecutar_todos mide la lectura aparte de los reportes, como con SQLite.
+    def precalcular(self):
+        return self.grupos, self.valores_por_variable
+
+    def serie_diaria_por_provincia(self):
+        return self.parquet.serie_diaria_por_provincia()
+
+    def departamentos_confirmados(self):
+        return self.parquet.departamentos_confirmados()
+
+def cambiar_almacen():
+    global ALMACEN
+    if ALMACEN == "sqlite":
+        if importar_pyarrow() is None:
+            return
+        if not os.path.isdir(RUTA_PARQUET):
+            print(f"❌ No existe {RUTA_PARQUET}. Convertí primero el CSV a Parquet.")
+            return
+        ALMACEN = "parquet"
+    else:
+        ALMACEN = "sqlite"
+    print(f"✅ Los reportes ahora leen desde: {ALMACEN}")
 
+def ver_valores_clasificacion():
+    with obtener_sesion().conexion() as conn:
+        # La tabla de valores ya tiene una fila por cada clasificación distinta cargada
+        valores = conn.execute(CONSULTAS["clasificaciones"]).fetchall()
+
+    print("\n🔍 Valores únicos en la columna 'clasificacion':")
+    for v in valores:
+        print(f"- '{v[0]}'")
+
+
+def diagnostico_confirmados_por_sexo():
+    with obtener_sesion().conexion() as conn:
+        cur = conn.cursor()
+
+        print("\n🔎 Diagnóstico de la tabla 'casos'")
+
+        # Sexo y clasificaciones salen del perfil de calidad: cada valor guardado y
+        # cómo venía escrito en el CSV cuando no era exactamente igual
+        cur.execute(CONSULTAS["calidad_variable"], ("sexo",))
+        frecuencias, nulos, variantes = cur.fetchone() or ("[]", 0, "[]")
+        print("\n📌 Valores únicos en 'sexo':")
+        for valor, cantidad in json.loads(frecuencias):
+            print(f"- {repr(valor)}: {cantidad} registros")
+        if nulos:
+            print(f"- None: {nulos} registros")
+        for texto, cantidad in json.loads(variantes):
+            print(f"   ⚠️ escrito como {repr(texto)} en {cantidad} registros")
+
+        cur.execute(CONSULTAS["calidad_variable"], ("clasificacion",))
+        frecuencias, _, variantes = cur.fetchone() or ("[]", 0, "[]")
+        print("\n📌 Clasificaciones que contienen 'confirmado':")
+        for valor, cantidad in json.loads(frecuencias):
+            if es_confirmado(valor):
+                print(f"- {repr(valor)}: {cantidad} registros")
+        for texto, cantidad in json.loads(variantes):
+            if es_confirmado(texto):
+                print(f"   ⚠️ escrito como {repr(texto)} en {cantidad} registros")
+
+        # Ver cantidad de casos confirmados por sexo
+        print("\n📌 Casos confirmados por sexo:")
+        cur.execute(CONSULTAS["diagnostico_confirmados_por_sexo"])
+        for fila in cur.fetchall():
+            print(f"- {repr(fila[0])}: {fila[1]} casos confirmados")
+
+# Perfil de calidad de los datos cargados (se arma durante la carga, así que
+# revisarlo después de cada actualización no recorre la tabla)
+@perfilado
+def calidad_datos(fuente=None):
+    with abrir_fuente(fuente) as fuente:
+        columnas = fuente.consultar("calidad")
+        rechazadas = fuente.consultar("calidad_rechazadas")[0][0]
+
+    if not columnas:
+        print("❌ No hay perfil de calidad: cargue los datos en SQLite para armarlo.")
+        return
 
+    print("\n🧪 Perfil de calidad de los datos cargados")
+    print(f"Filas con 12 columnas: {columnas[0][1]}")
+    print(f"Filas rechazadas (otra cantidad de columnas): {rechazadas}")
+    print(f"\n{'Variable':<33} {'Nulos':>9} {'Vacíos':>9} {'Espacios':>9} {'Inválidos':>9} {'Distintos':>10}  Mínimo → Máximo")
+    print("-" * 120)
+    for var, _, nulos, vacios, con_espacios, invalidos, distintos, truncado, minimo, maximo, variantes in columnas:
+        distintos = f"≥{distintos}" if truncado else str(distintos)
+        print(f"{var:<33} {nulos:>9} {vacios:>9} {con_espacios:>9} {invalidos:>9} {distintos:>10}  {minimo} → {maximo}")
+        variantes = json.loads(variantes)
+        if variantes:
+            ejemplos = ", ".join(f"{texto!r} ({cantidad})" for texto, cantidad in variantes[:3])
+            print(f"{'':<33} ⚠️ escritos de otra forma en el CSV: {ejemplos}")
+
+
+# Tabla de cada alias de una consulta ("FROM casos c", "JOIN provincias AS p") y
+# columnas que se usan para unir dos tablas ("c.residencia_provincia_id = p.id")
+ALIAS_SQL = re.compile(r"\b(?:FROM|JOIN)\s+([\w.]+)(?:\s+(?:AS\s+)?(?!(?:ON|WHERE|JOIN|LEFT|INNER|CROSS|GROUP|ORDER|LIMIT|USING)\b)(\w+))?",
+                       re.IGNORECASE)
+UNION_SQL = re.compile(r"(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)")
+PASO_PLAN = re.compile(r"(SCAN|SEARCH) ([\w.]+)(.*)")
+
+# Pasos del plan que leen todas las filas de casos. Un SCAN siempre las lee (aunque
+# sea a través de un índice). Un SEARCH también, si solo lo restringen las columnas
+# de unión y todos los pasos de afuera recorren sus tablas completas: el bucle
+# anidado termina pidiendo cada combinación de claves, es decir, toda la tabla.
+def lecturas_completas(sql, plan):
+    tablas = {}
+    for tabla, alias in ALIAS_SQL.findall(sql):
+        tablas[alias or tabla] = tabla
+    uniones = set()
+    for alias1, columna1, alias2, columna2 in UNION_SQL.findall(sql):
+        uniones.update([(alias1, columna1), (alias2, columna2)])
+
+    completas = []
+    afuera = {}  # padre → ¿todos los pasos anteriores con ese padre son SCAN?
+    for _, padre, _, detalle in plan:
+        paso = PASO_PLAN.match(detalle)
+        if paso is None:
+            continue
+        tipo, alias, resto = paso.groups()
+        todos_scan = afuera.get(padre, True)
+        if tablas.get(alias, alias) == "casos":
+            if tipo == "SCAN":
+                completas.append(detalle)
+            else:
+                restricciones = re.findall(r"(\w+)(?:=|>|<)", resto[resto.rfind("("):])
+                if todos_scan and all((alias, columna) in uniones for columna in restricciones):
+                    completas.append(detalle)
+        afuera[padre] = todos_scan and tipo == "SCAN"
+    return tablas, completas
+
+# Muestra el plan de cada consulta de los reportes (con la tabla que lee cada paso)
+# y avisa cuáles siguen leyendo la tabla casos completa.
+def asesor_indices():
+    with obtener_sesion().conexion() as conn:
+        cur = conn.cursor()
+
+        print("\n🧭 Asesor de índices (EXPLAIN QUERY PLAN)")
+
+        consultas = list(CONSULTAS.items())
+        # Las consultas del censo necesitan sus tablas temporales
+        if os.path.exists(RUTA_CENSO):
+            preparar_censo(conn)
+        else:
+            consultas = [(nombre, sql) for nombre, sql in consultas if not nombre.startswith("censo_")]
+
+        con_scan = []
+        for nombre, sql in consultas:
+            cur.execute("EXPLAIN QUERY PLAN " + sql, [None] * sql.count("?"))
+            plan = cur.fetchall()
+            tablas, completas = lecturas_completas(sql, plan)
+            print(f"\n{'⚠️' if completas else '✅'} {nombre}")
+            for _, _, _, detalle in plan:
+                paso = PASO_PLAN.match(detalle)
+                tabla = f"  [{tablas.get(paso.group(2), paso.group(2))}]" if paso else ""
+                marca = "  ⬅ lee todas las filas de casos" if detalle in completas else ""
+                print(f"   {detalle}{tabla}{marca}")
+            if completas:
+                con_scan.append(nombre)
+
+        if con_scan:
+            print(f"\n⚠️ {len(con_scan)} consultas leen toda la tabla casos: {', '.join(con_scan)}")
+        else:
+            print("\n✅ Ninguna consulta lee la tabla casos completa.")
+
+
+# Reportes que se pueden pedir por nombre desde la línea de comandos
+REPORTES = {
+    "punto1": punto1_describir_variables,
+    "punto2": punto2_edad_faltante,
+    "punto3": punto3_promedio_edad_fallecidos,
+    "punto4": punto4_sturges_intervalos,
+    "punto5": punto5_mujeres_hombres_fallecidos_por_intervalo,
+    "punto6": punto6_confirmados_por_provincia_y_sexo,
+    "punto7": punto7_menor_proporcion_confirmados_sobre_poblacion,
+    "punto8": punto8_proporcion_fallecidos_sobre_poblacion,
+    "punto9": punto9_indice_confirmados_por_sexo,
+    "cuartiles": cuartiles_fallecidos_por_grupo,
+    "tasas": tasas_por_100k,
+    "serie": serie_temporal,
+    "departamentos": tablero_departamentos,
+    "calidad": calidad_datos,
+}
+
+# Envuelve la fuente de un reporte y guarda todo lo que el reporte le pide, para
+# la salida en JSON o CSV: {consulta: [{"parametros": [...], "filas": [[...], ...]}]}
+class FuenteRegistrada:
+    def __init__(self, fuente, registro):
+        self.fuente = fuente
+        self.registro = registro
+
+    def consultar(self, nombre, parametros=()):
+        filas = self.fuente.consultar(nombre, parametros)
+        self.registro.setdefault(nombre, []).append({"parametros": list(parametros), "filas": [list(fila) for fila in filas]})
+        return filas
+
+    def valores(self, var, clasificacion):
+        valores = self.fuente.valores(var, clasificacion)
+        self.registro.setdefault(f"valores_{var}", []).append({"parametros": [], "filas": [[valor] for valor in valores]})
+        return valores
+
+def reporte_registrado(nombre, registro):
+    with abrir_fuente() as fuente:
+        REPORTES[nombre](FuenteRegistrada(fuente, registro))
+
+def escribir_resultados(resultados, formato, salida):
+    if formato == "json":
+        json.dump(resultados, salida, ensure_ascii=False, indent=2)
+        salida.write("\n")
+        return
+    escritor = csv.writer(salida)
+    escritor.writerow(["reporte", "consulta", "parametros", "valores"])
+    for reporte, consultas in resultados.items():
+        for consulta, llamadas in consultas.items():
+            for llamada in llamadas:
+                parametros = json.dumps(llamada["parametros"], ensure_ascii=False)
+                # Cada consulta devuelve otras columnas: la fila va entera en una celda JSON
+                for fila in llamada["filas"]:
+                    escritor.writerow([reporte, consulta, parametros, json.dumps(fila, ensure_ascii=False)])
+
+# Con formato "texto" solo se imprimen las tablas. Con "json" o "csv" las tablas van
+# a stderr y a stdout sale lo que consultó cada reporte, para otros programas.
+def generar_reportes(nombres, formato="texto", paralelo=False):
+    if formato == "texto":
+        puntos = [REPORTES[nombre] for nombre in nombres]
+        if paralelo:
+            ejecutar_en_paralelo(puntos)
+        else:
+            for punto in puntos:
+                punto()
+        return
 
+    resultados = {nombre: {} for nombre in nombres}
+    # Cada tarea conserva el nombre del reporte para los mensajes de error
+    tareas = [functools.update_wrapper(functools.partial(reporte_registrado, nombre, resultados[nombre]), REPORTES[nombre])
+              for nombre in nombres]
+    salida = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        if paralelo:
+            ejecutar_en_paralelo(tareas)
+        else:
+            for tarea in tareas:
+                tarea()
+    escribir_resultados(resultados, formato, salida)
 
 # Menú principal
 def menu():
@@ -582,6 +2415,23 @@ def menu():
         print("9. Punto 7 - Menor proporción de confirmados vs población")
         print("10. Punto 8 - Proporción fallecidos vs población (Censo)")
         print("11. Punto 9 - Índice de confirmados por sexo")
+        print("12. Cargar datos desde CSV en paralelo (varios procesos)")
+        print("13. Ejecutar todos los puntos (una sola pasada por la tabla)")
+        print("14. Cuartiles y outliers de edad de fallecidos por provincia y sexo")
+        print("15. Vaciar caché de resultados")
+        print("16. Actualizar datos desde CSV (carga incremental)")
+        print("17. Convertir CSV a Parquet (almacenamiento columnar)")
+        print("18. Cambiar almacenamiento de los reportes (SQLite/Parquet)")
+        print("19. Analizar el CSV directamente (sin base de datos)")
+        print("20. Indexar el CSV (acceso directo por fila)")
+        print("21. Tasas cada 100.000 habitantes por provincia y sexo (Censo 2022)")
+        print("22. Serie temporal: promedios móviles, crecimiento y picos")
+        print("23. Tablero por departamento (confirmados, % fallecidos, % ARM)")
+        print("24. Ejecutar los nueve reportes en paralelo")
+        print("25. Exploración aproximada (bosquejos y muestra, en milisegundos)")
+        print("26. Cambiar valores de ejemplo del punto 1 (exactos/aproximados)")
+        print("27. Perfil de calidad de los datos (nulos, vacíos, espacios, valores inválidos)")
+        print("88. Asesor de índices (planes de las consultas)")
         print("89. Diagnóstico de sexo y confirmación (debug)")
         print("99. Ver valores únicos de 'clasificacion'")
         print("0. Salir")
@@ -609,16 +2459,133 @@ def menu():
             punto8_proporcion_fallecidos_sobre_poblacion()
         elif opcion == "11":
             punto9_indice_confirmados_por_sexo()
+        elif opcion == "12":
+            cargar_datos(procesos=os.cpu_count() or 1)
+        elif opcion == "13":
+            ejecutar_todos()
+        elif opcion == "14":
+            cuartiles_fallecidos_por_grupo()
+        elif opcion == "15":
+            vaciar_cache()
+        elif opcion == "16":
+            cargar_incremental()
+        elif opcion == "17":
+            convertir_a_parquet()
+        elif opcion == "18":
+            cambiar_almacen()
+        elif opcion == "19":
+            analizar_csv()
+        elif opcion == "20":
+            indexar_csv()
+        elif opcion == "21":
+            tasas_por_100k()
+        elif opcion == "22":
+            serie_temporal()
+        elif opcion == "23":
+            tablero_departamentos()
+        elif opcion == "24":
+            ejecutar_en_paralelo()
+        elif opcion == "25":
+            exploracion_aproximada()
+        elif opcion == "26":
+            cambiar_modo_aproximado()
+        elif opcion == "27":
+            calidad_datos()
+        elif opcion == "88":
+            asesor_indices()
         elif opcion == "89":
             diagnostico_confirmados_por_sexo()
         elif opcion == "99":
             ver_valores_clasificacion()
         elif opcion == "0":
+            cerrar_sesion()
+            exportar_perfil()
             print("👋 Saliendo...")
             break
         else:
             print("❌ Opción no válida.")
 
-# Ejecutar menú
+# Línea de comandos, para correr el análisis sin el menú (por ejemplo desde una
+# tarea programada). Sin argumentos abre el menú interactivo.
+#   python ejercicios.py --csv Covid19Casos.csv init
+#   python ejercicios.py --csv Covid19Casos.csv load
+#   python ejercicios.py report punto6 punto9 --formato json
+#   python ejercicios.py --perfil report todos
+def main(argv=None):
+    global RUTA_DB, RUTA_CSV
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        menu()
+        return 0
+
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="ejercicios.py", description="Análisis de los casos de COVID-19 en Argentina.")
+    parser.add_argument("--db", default=RUTA_DB, help=f"base de datos SQLite (por defecto {RUTA_DB})")
+    parser.add_argument("--csv", default=RUTA_CSV, help="CSV de casos a cargar")
+    parser.add_argument("--perfil", action="store_true",
+                        help=f"mide reportes y consultas y guarda {RUTA_PERFIL}.json y {RUTA_PERFIL}.folded")
+    parser.add_argument("--perfil-memoria", action="store_true",
+                        help="como --perfil, y además la memoria pico de Python (bastante más lento)")
+    parser.add_argument("--memoria", type=int, metavar="MB",
+                        help="presupuesto de memoria: lotes y cachés de SQLite acotados a esa cantidad de MB")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    comandos.add_parser("init", help="crea las tablas (borra los datos cargados)")
+
+    carga = comandos.add_parser("load", help="carga el CSV en la base")
+    carga.add_argument("--incremental", action="store_true", help="actualiza solo los últimos días en lugar de recargar todo")
+    carga.add_argument("--procesos", type=int, default=1, help="procesos para leer el CSV (carga completa)")
+
+    reporte = comandos.add_parser("report", help="ejecuta uno o más reportes")
+    reporte.add_argument("puntos", nargs="*", metavar="REPORTE",
+                         help=f"{', '.join(REPORTES)} o todos (los nueve puntos, por defecto)")
+    reporte.add_argument("--formato", choices=["texto", "json", "csv"], default="texto",
+                         help="json o csv: además de las tablas (a stderr), los datos de cada reporte a stdout")
+    reporte.add_argument("--paralelo", action="store_true", help="ejecuta los reportes a la vez")
+    reporte.add_argument("--parquet", action="store_true", help=f"lee desde {RUTA_PARQUET} en lugar de la base")
+    reporte.add_argument("--aproximado", action="store_true", help="valores de ejemplo del punto 1 desde los bosquejos")
+
+    args = parser.parse_args(argv)
+    if args.comando == "report":
+        desconocidos = [nombre for nombre in args.puntos if nombre not in REPORTES and nombre != "todos"]
+        if desconocidos:
+            parser.error(f"reporte desconocido: {', '.join(desconocidos)}")
+    RUTA_DB = args.db
+    RUTA_CSV = args.csv
+    if args.perfil or args.perfil_memoria:
+        activar_perfil(memoria=args.perfil_memoria)
+    if args.memoria:
+        aplicar_presupuesto(args.memoria)
+
+    try:
+        if args.comando == "init":
+            crear_tabla()
+        elif args.comando == "load":
+            if args.incremental:
+                cargar_incremental()
+            else:
+                cargar_datos(procesos=args.procesos)
+        elif args.comando == "report":
+            # Los avisos van a stderr: con json o csv, stdout queda solo para los datos
+            with contextlib.redirect_stdout(sys.stderr):
+                if args.parquet:
+                    cambiar_almacen()
+                if args.aproximado:
+                    cambiar_modo_aproximado()
+            if args.parquet and ALMACEN != "parquet":
+                return 1
+            nombres = args.puntos or ["todos"]
+            if "todos" in nombres:
+                nombres = [nombre for nombre in REPORTES if nombre.startswith("punto")]
+            generar_reportes(nombres, args.formato, args.paralelo)
+    finally:
+        cerrar_sesion()
+        # Con salida json/csv, el resumen del perfil no se mezcla con los datos
+        with contextlib.redirect_stdout(sys.stderr):
+            exportar_perfil()
+    return 0
+
 if __name__ == "__main__":
-    menu()
+    sys.exit(main())
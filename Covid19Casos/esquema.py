@@ -0,0 +1,38 @@
+# Columnas del dataset y de la tabla casos. Las comparten la carga, los bosquejos,
+# el almacenamiento Parquet y los reportes.
+
+# Variables del dataset: nombre, tipo y clasificación
+VARIABLES = [
+    ("sexo", "Cualitativa", "Nominal"),
+    ("edad", "Cuantitativa", "Discreta"),
+    ("edad_años_meses", "Cualitativa", "Nominal"),
+    ("residencia_pais_nombre", "Cualitativa", "Nominal"),
+    ("residencia_provincia_nombre", "Cualitativa", "Nominal"),
+    ("residencia_departamento_nombre", "Cualitativa", "Nominal"),
+    ("carga_provincia_nombre", "Cualitativa", "Nominal"),
+    ("fallecido", "Cualitativa", "Binaria"),
+    ("asistencia_respiratoria_mecanica", "Cualitativa", "Binaria"),
+    ("origen_financiamiento", "Cualitativa", "Nominal"),
+    ("clasificacion", "Cualitativa", "Nominal"),
+    ("fecha_diagnostico", "Cualitativa", "Ordinal")
+]
+
+# Columnas de casos, en el orden en que se insertan las filas codificadas
+COLUMNAS_CASOS = (
+    "sexo_id", "edad", "edad_años_meses", "residencia_pais_nombre", "residencia_provincia_id",
+    "residencia_departamento_id", "carga_provincia_id", "fallecido", "asistencia_respiratoria_mecanica",
+    "origen_financiamiento", "clasificacion_id", "fecha_diagnostico",
+)
+
+# Columnas guardadas como id: columna en casos, tabla de valores y columna de texto
+COLUMNAS_CODIFICADAS = {
+    "sexo": ("sexo_id", "sexos", "codigo"),
+    "residencia_provincia_nombre": ("residencia_provincia_id", "provincias", "nombre"),
+    "residencia_departamento_nombre": ("residencia_departamento_id", "departamentos", "nombre"),
+    "carga_provincia_nombre": ("carga_provincia_id", "provincias", "nombre"),
+    "clasificacion": ("clasificacion_id", "clasificaciones", "nombre"),
+}
+
+# Una clasificación cuenta como caso confirmado si lo dice su nombre
+def es_confirmado(clasificacion):
+    return "confirmado" in clasificacion.lower()
@@ -0,0 +1,45 @@
+# Cuartiles, outliers e intervalos de edad de los reportes (puntos 3, 4 y 5)
+
+# Cuartiles exactos a partir de una tabla de frecuencias [(edad, cantidad)] ordenada
+# por edad. Usa las mismas posiciones que si se ordenaran todas las edades en una
+# lista (Q1 = lista[n // 4], Q3 = lista[3 * n // 4]), pero sin armar esa lista:
+# la memoria depende de la cantidad de edades distintas, no de la cantidad de casos.
+def valor_en_posicion(frecuencias, posicion):
+    acumulado = 0
+    for edad, cantidad in frecuencias:
+        acumulado += cantidad
+        if posicion < acumulado:
+            return edad
+    return None
+
+def calcular_cuartiles(frecuencias):
+    n = sum(cantidad for _, cantidad in frecuencias)
+    if n < 4:
+        return None
+    Q1 = valor_en_posicion(frecuencias, n // 4)
+    Q3 = valor_en_posicion(frecuencias, 3 * n // 4)
+    IQR = Q3 - Q1
+    return Q1, Q3, IQR, Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+
+# Cantidad de outliers (criterio IQR) y los primeros 10 en orden de edad
+def contar_outliers(frecuencias, lim_inf, lim_sup):
+    cantidad = 0
+    ejemplos = []
+    for edad, n in frecuencias:
+        if edad < lim_inf or edad > lim_sup:
+            cantidad += n
+            ejemplos.extend([edad] * min(n, 10 - len(ejemplos)))
+    return cantidad, ejemplos
+
+# Cuenta casos por intervalos de ancho fijo a partir de una tabla de frecuencias
+# [(edad, cantidad)]. El intervalo de cada edad sale de una división entera, así se
+# recorre cada edad distinta una sola vez en lugar de cada caso contra cada intervalo.
+def contar_por_intervalo(frecuencias, inicio, ancho, k):
+    conteos = [0] * k
+    if ancho <= 0:
+        return conteos
+    for edad, cantidad in frecuencias:
+        i = (edad - inicio) // ancho
+        if 0 <= i < k:
+            conteos[i] += cantidad
+    return conteos
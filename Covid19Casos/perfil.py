@@ -0,0 +1,272 @@
+import collections
+import contextlib
+import datetime
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+import tracemalloc
+
+# Perfil de ejecución, apagado por defecto. Con la variable de entorno COVID_PERFIL=1
+# (o --perfil en la línea de comandos) se mide cada reporte, cada carga y cada
+# sentencia SQL: tiempo (contando la lectura de las filas), filas devueltas o
+# escritas y pasos de la máquina virtual de SQLite. Las conexiones abiertas con el
+# perfil activo miden todo lo que ejecutan, así que también entran las cargas, los
+# cubos, la carga incremental, el modo aproximado, el asesor y el diagnóstico.
+# La memoria pico de Python (tracemalloc) es aparte, con COVID_PERFIL=memoria o
+# --perfil-memoria, porque hace varias veces más lento todo lo que crea objetos.
+# Al terminar se guarda en perfil.json y en perfil.folded (pilas para flamegraph.pl
+# o speedscope). Apagado solo cuesta un "if" por llamada.
+RUTA_PERFIL = "perfil"
+PASOS_PROGRESO = 100  # cada cuántas instrucciones de SQLite se anota un llamado
+PERFIL = None
+
+class Perfil:
+    def __init__(self, memoria=False):
+        self.candado = threading.Lock()
+        self.hilo = threading.local()
+        self.registros = []
+        self.fecha = datetime.datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter()
+        self.memoria = memoria
+        self.paralelos = 0  # bloques de hilos en paralelo en curso
+        if memoria:
+            tracemalloc.start()
+
+    # Mediciones abiertas en este hilo, de la más externa a la más interna
+    def pila(self):
+        if not hasattr(self.hilo, "pila"):
+            self.hilo.pila = []
+        return self.hilo.pila
+
+    # Mide lo que pase dentro del with. Con conn (una ConexionPerfilada), cuenta además
+    # los pasos de SQLite. La memoria pico es la de todo el proceso, así que mientras
+    # corren hilos en paralelo no se mide por llamada: solo el total del bloque.
+    @contextlib.contextmanager
+    def medir(self, tipo, nombre, conn=None, sql=None):
+        pila = self.pila()
+        medir_memoria = self.memoria and not self.paralelos
+        memoria = 0
+        if medir_memoria:
+            memoria, pico = tracemalloc.get_traced_memory()
+            # El pico se reinicia para esta medición; antes se lo pasa a las que la contienen
+            for marco in pila:
+                marco["pico"] = max(marco["pico"], pico)
+            tracemalloc.reset_peak()
+        marco = {"etiqueta": nombre if tipo == "funcion" else f"sql:{nombre}", "memoria": memoria,
+                 "pico": memoria, "hijos": 0.0, "filas": None}
+        pasos = conn.pasos if conn is not None else 0
+        pila.append(marco)
+        inicio = time.perf_counter()
+        try:
+            yield marco
+        finally:
+            segundos = time.perf_counter() - inicio
+            if medir_memoria:
+                pico = tracemalloc.get_traced_memory()[1]
+                for abierto in pila:
+                    abierto["pico"] = max(abierto["pico"], pico)
+            etiquetas = [abierto["etiqueta"] for abierto in pila]
+            pila.pop()
+            if pila:
+                pila[-1]["hijos"] += segundos
+            registro = {
+                "tipo": tipo,
+                "nombre": nombre,
+                "pila": etiquetas,
+                "segundos": segundos,
+                "segundos_propios": segundos - marco["hijos"],
+                "filas": marco["filas"],
+                "pasos_vm": conn.pasos - pasos if conn is not None else None,
+                "memoria_pico_kb": (marco["pico"] - memoria) / 1024 if medir_memoria else None,
+                "sql": sql,
+                "hilo": threading.current_thread().name,
+            }
+            marco["registro"] = registro
+            with self.candado:
+                self.registros.append(registro)
+
+    # Suma a una sentencia ya medida el tiempo y las filas de una lectura posterior
+    # (fetch). Solo la toca el hilo que la ejecutó, así que no hace falta el candado.
+    def sumar_lectura(self, registro, segundos, filas, pasos):
+        pila = self.pila()
+        if pila:
+            pila[-1]["hijos"] += segundos
+        registro["segundos"] += segundos
+        registro["segundos_propios"] += segundos
+        registro["filas"] += filas
+        registro["pasos_vm"] += pasos
+
+    # Mientras dure el with, las mediciones que empiecen no miden la memoria
+    @contextlib.contextmanager
+    def en_paralelo(self):
+        with self.candado:
+            self.paralelos += 1
+        try:
+            yield
+        finally:
+            with self.candado:
+                self.paralelos -= 1
+
+    # Totales por función o consulta, de la que más tiempo lleva a la que menos
+    def totales(self):
+        totales = {}
+        for registro in self.registros:
+            clave = (registro["tipo"], registro["nombre"])
+            total = totales.setdefault(clave, {"tipo": registro["tipo"], "nombre": registro["nombre"], "llamadas": 0,
+                                               "segundos": 0.0, "filas": 0, "pasos_vm": 0, "memoria_pico_kb": None})
+            total["llamadas"] += 1
+            total["segundos"] += registro["segundos"]
+            total["filas"] += registro["filas"] or 0
+            total["pasos_vm"] += registro["pasos_vm"] or 0
+            if registro["memoria_pico_kb"] is not None:
+                total["memoria_pico_kb"] = max(total["memoria_pico_kb"] or 0.0, registro["memoria_pico_kb"])
+        return sorted(totales.values(), key=lambda total: -total["segundos"])
+
+    # Formato "folded": una línea por pila con el tiempo propio en microsegundos
+    def pilas(self):
+        tiempos = collections.Counter()
+        for registro in self.registros:
+            tiempos[";".join(registro["pila"])] += registro["segundos_propios"]
+        return [f"{pila} {round(segundos * 1e6)}" for pila, segundos in sorted(tiempos.items())]
+
+def activar_perfil(memoria=False):
+    global PERFIL
+    if PERFIL is None:
+        PERFIL = Perfil(memoria)
+
+# Para funciones enteras (reportes, cargas)
+def perfilado(funcion):
+    @functools.wraps(funcion)
+    def envoltura(*args, **kwargs):
+        if PERFIL is None:
+            return funcion(*args, **kwargs)
+        with PERFIL.medir("funcion", funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+# Consultas con nombre (sql → nombre), para mostrarlas así en el perfil. Las de los
+# reportes se registran al importar ejercicios.
+NOMBRES_CONSULTAS = {}
+
+def registrar_consultas(consultas):
+    for nombre, sql in consultas.items():
+        NOMBRES_CONSULTAS.setdefault(sql, nombre)
+    nombre_sentencia.cache_clear()
+
+# Nombre de una sentencia en el perfil: el registrado si es una de esas consultas, si
+# no el comienzo del SQL
+@functools.lru_cache(maxsize=1024)
+def nombre_sentencia(sql):
+    return NOMBRES_CONSULTAS.get(sql) or " ".join(sql.split())[:60]
+
+# Cursor que mide cada sentencia y cada lectura de filas en el perfil
+class CursorPerfilado(sqlite3.Cursor):
+    registro = None  # medición de la última sentencia, a la que se suman las lecturas
+
+    def execute(self, sql, parametros=(), nombre=None):
+        return self.medir(super().execute, sql, parametros, nombre)
+
+    def executemany(self, sql, parametros, nombre=None):
+        return self.medir(super().executemany, sql, parametros, nombre)
+
+    def medir(self, ejecutar, sql, parametros, nombre):
+        with PERFIL.medir("consulta", nombre or nombre_sentencia(sql), self.connection, sql) as marco:
+            ejecutar(sql, parametros)
+            # Las escrituras cuentan las filas que tocaron; las lecturas, las que se leen después
+            marco["filas"] = max(self.rowcount, 0)
+        self.registro = marco["registro"]
+        return self
+
+    # Lee con la función dada y suma a la sentencia el tiempo y las filas leídas
+    def leer(self, leer, contar=len):
+        inicio, pasos = time.perf_counter(), self.connection.pasos
+        filas = leer()
+        if self.registro is not None:
+            PERFIL.sumar_lectura(self.registro, time.perf_counter() - inicio, contar(filas), self.connection.pasos - pasos)
+        return filas
+
+    def fetchone(self):
+        return self.leer(super().fetchone, lambda fila: fila is not None)
+
+    def fetchmany(self, *args, **kwargs):
+        return self.leer(functools.partial(super().fetchmany, *args, **kwargs))
+
+    def fetchall(self):
+        return self.leer(super().fetchall)
+
+    # Al terminar, el StopIteration sale directo de leer (ese último paso no se suma)
+    def __next__(self):
+        return self.leer(super().__next__, lambda fila: 1)
+
+# Conexión que mide en el perfil todo lo que ejecuta (ver conectar)
+class ConexionPerfilada(sqlite3.Connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pasos = 0
+        self.set_progress_handler(self.contar_pasos, PASOS_PROGRESO)
+
+    def contar_pasos(self):
+        self.pasos += PASOS_PROGRESO
+        return 0
+
+    def cursor(self, factory=CursorPerfilado):
+        return super().cursor(factory)
+
+    def execute(self, sql, parametros=()):
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        return self.cursor().executemany(sql, parametros)
+
+# Abre una conexión a SQLite; con el perfil activo, una ConexionPerfilada. Las
+# conexiones abiertas antes de activar el perfil no se miden.
+def conectar(ruta, **opciones):
+    if PERFIL is not None:
+        opciones["factory"] = ConexionPerfilada
+    return sqlite3.connect(ruta, **opciones)
+
+# Ejecuta una consulta de lectura y devuelve todas sus filas. Con el perfil activo la
+# mide la conexión; acá solo se le pone el nombre de la consulta.
+def ejecutar_sql(conn, nombre, sql, parametros=()):
+    if isinstance(conn, ConexionPerfilada):
+        return conn.cursor().execute(sql, parametros, nombre=nombre).fetchall()
+    return conn.execute(sql, parametros).fetchall()
+
+# Mientras corren varios reportes a la vez, la memoria pico no se mide por reporte
+def en_paralelo():
+    if PERFIL is None or not PERFIL.memoria:
+        return contextlib.nullcontext()
+    return PERFIL.en_paralelo()
+
+def exportar_perfil(prefijo=RUTA_PERFIL):
+    if PERFIL is None:
+        return
+    with PERFIL.candado:
+        datos = {
+            "fecha": PERFIL.fecha,
+            "segundos": time.perf_counter() - PERFIL.inicio,
+            "memoria_pico_kb": tracemalloc.get_traced_memory()[1] / 1024 if PERFIL.memoria else None,
+            "totales": PERFIL.totales(),
+            "registros": list(PERFIL.registros),
+        }
+        pilas = PERFIL.pilas()
+    with open(prefijo + ".json", "w", encoding="utf-8") as archivo:
+        json.dump(datos, archivo, ensure_ascii=False, indent=2)
+    with open(prefijo + ".folded", "w", encoding="utf-8") as archivo:
+        archivo.writelines(linea + "\n" for linea in pilas)
+
+    print(f"\n⏱️ Perfil guardado en {prefijo}.json y {prefijo}.folded. Lo que más tiempo llevó:")
+    print(f"{'Tipo':<9} {'Nombre':<45} {'Llamadas':>8} {'Segundos':>9} {'Filas':>9} {'Pasos VM':>11} {'Mem. KB':>9}")
+    print("-" * 106)
+    for total in datos["totales"][:15]:
+        # Filas y pasos solo tienen sentido para las consultas
+        filas, pasos = (total["filas"], total["pasos_vm"]) if total["tipo"] == "consulta" else ("-", "-")
+        memoria = "-" if total["memoria_pico_kb"] is None else f"{total['memoria_pico_kb']:.1f}"
+        print(f"{total['tipo']:<9} {total['nombre'][:45]:<45} {total['llamadas']:>8} {total['segundos']:>9.3f} "
+              f"{filas:>9} {pasos:>11} {memoria:>9}")
+
+if os.environ.get("COVID_PERFIL"):
+    activar_perfil(memoria=os.environ["COVID_PERFIL"] == "memoria")
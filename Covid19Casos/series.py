@@ -0,0 +1,68 @@
+import datetime
+import itertools
+
+# Series temporales por fecha de diagnóstico. Una sola consulta agrupada trae los
+# confirmados y fallecidos de cada provincia y día; con eso se arma una lista densa
+# por provincia (un valor por día, con ceros en los días sin casos) y todo lo demás
+# (promedios móviles, crecimiento, picos) sale de sumas acumuladas sobre esas listas,
+# sin volver a consultar la base.
+VENTANAS_MOVILES = (7, 14)
+RADIO_PICO = 14  # días a cada lado en los que un pico tiene que ser el máximo
+UMBRAL_PICO = 0.2  # fracción del máximo de la serie que tiene que superar un pico
+
+# {provincia: (confirmados, fallecidos)} con listas de un valor por día desde fecha_inicio.
+# "Total país" es la suma de todas las provincias.
+def armar_series(filas):
+    fechas = {fecha: datetime.date.fromisoformat(fecha) for _, fecha, _, _ in filas}
+    if not fechas:
+        return None, 0, {}
+    fecha_inicio = min(fechas.values())
+    dias = (max(fechas.values()) - fecha_inicio).days + 1
+
+    series = {}
+    total = ([0] * dias, [0] * dias)
+    for provincia, fecha, confirmados, fallecidos in filas:
+        if provincia not in series:
+            series[provincia] = ([0] * dias, [0] * dias)
+        dia = (fechas[fecha] - fecha_inicio).days
+        for serie in (series[provincia], total):
+            serie[0][dia] += confirmados
+            serie[1][dia] += fallecidos
+    series = dict(sorted(series.items()))
+    series["Total país"] = total
+    return fecha_inicio, dias, series
+
+# Promedio de los últimos "ventana" días (o de los que haya, al principio de la serie)
+def media_movil(serie, ventana):
+    acumulado = [0, *itertools.accumulate(serie)]
+    return [(acumulado[i + 1] - acumulado[max(0, i + 1 - ventana)]) / min(i + 1, ventana)
+            for i in range(len(serie))]
+
+# Variación de la suma de cada ventana respecto de la ventana anterior (None si la
+# anterior no tiene casos o todavía no hay dos ventanas completas)
+def tasa_crecimiento(serie, ventana):
+    acumulado = [0, *itertools.accumulate(serie)]
+    tasas = []
+    for i in range(len(serie)):
+        fin = i + 1
+        if fin < 2 * ventana:
+            tasas.append(None)
+            continue
+        actual = acumulado[fin] - acumulado[fin - ventana]
+        anterior = acumulado[fin - ventana] - acumulado[fin - 2 * ventana]
+        tasas.append(actual / anterior - 1 if anterior else None)
+    return tasas
+
+# Días (a partir de "desde") en los que la serie es el máximo dentro de ±radio días
+# y supera umbral * máximo
+def detectar_picos(serie, radio=RADIO_PICO, umbral=UMBRAL_PICO, desde=0):
+    if len(serie) <= desde:
+        return []
+    minimo = max(serie[desde:]) * umbral
+    picos = []
+    for i, valor in enumerate(serie[desde:], desde):
+        if valor > 0 and valor >= minimo and valor == max(serie[max(0, i - radio):i + radio + 1]):
+            # En una meseta de valores iguales, solo el primer día
+            if not picos or i - picos[-1] > radio:
+                picos.append(i)
+    return picos
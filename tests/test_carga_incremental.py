@@ -0,0 +1,163 @@
+import collections
+import contextlib
+import csv
+import datetime
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Covid19Casos"))
+
+import benchmark
+import ejercicios
+
+# Contenido de la base con los ids reemplazados por sus textos, para poder comparar
+# dos bases que asignaron los ids en otro orden
+CONSULTA_CASOS = """
+    SELECT s.codigo, c.edad, c.edad_años_meses, c.residencia_pais_nombre, p.nombre, d.nombre, cp.nombre,
+           c.fallecido, c.asistencia_respiratoria_mecanica, c.origen_financiamiento, cl.nombre, c.fecha_diagnostico
+    FROM casos c
+    LEFT JOIN sexos s ON s.id = c.sexo_id
+    LEFT JOIN provincias p ON p.id = c.residencia_provincia_id
+    LEFT JOIN departamentos d ON d.id = c.residencia_departamento_id
+    LEFT JOIN provincias cp ON cp.id = c.carga_provincia_id
+    LEFT JOIN clasificaciones cl ON cl.id = c.clasificacion_id
+"""
+CONSULTA_CUBO = """
+    SELECT p.nombre, s.codigo, cl.nombre, cu.edad, cu.fallecido, cu.cantidad
+    FROM cubo cu
+    LEFT JOIN provincias p ON p.id = cu.residencia_provincia_id
+    LEFT JOIN sexos s ON s.id = cu.sexo_id
+    LEFT JOIN clasificaciones cl ON cl.id = cu.clasificacion_id
+"""
+CONSULTA_CUBO_DEPARTAMENTOS = """
+    SELECT p.nombre, d.nombre, cl.nombre, cd.fallecido, cd.asistencia_respiratoria_mecanica, cd.cantidad
+    FROM cubo_departamentos cd
+    LEFT JOIN departamentos d ON d.id = cd.residencia_departamento_id
+    LEFT JOIN provincias p ON p.id = d.provincia_id
+    LEFT JOIN clasificaciones cl ON cl.id = cd.clasificacion_id
+"""
+
+FILAS = 5000
+
+
+class CargaIncrementalTest(unittest.TestCase):
+    def setUp(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directorio)
+        self.addCleanup(setattr, ejercicios, "RUTA_DB", ejercicios.RUTA_DB)
+        self.addCleanup(setattr, ejercicios, "RUTA_CSV", ejercicios.RUTA_CSV)
+        self.addCleanup(setattr, ejercicios, "USAR_CACHE", ejercicios.USAR_CACHE)
+        self.addCleanup(ejercicios.cerrar_sesion)
+        ejercicios.USAR_CACHE = False
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmark.generar_csv("original.csv", FILAS, semilla=7)
+        with open("original.csv", encoding="utf-8", newline="") as archivo:
+            self.encabezado, *self.filas = csv.reader(archivo)
+        fecha_maxima = max(fila[11] for fila in self.filas if fila[11])
+        self.fecha_maxima = datetime.date.fromisoformat(fecha_maxima)
+        self.corte = (self.fecha_maxima - datetime.timedelta(days=ejercicios.VENTANA_INCREMENTAL_DIAS)).isoformat()
+
+    def escribir(self, ruta, filas):
+        with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+            escritor = csv.writer(archivo, quoting=csv.QUOTE_ALL, lineterminator="\n")
+            escritor.writerow(self.encabezado)
+            escritor.writerows(filas)
+
+    # Carga un CSV en la base indicada y devuelve lo que imprimió
+    def cargar(self, ruta_db, ruta_csv, incremental=False, crear=False):
+        ejercicios.RUTA_DB = ruta_db
+        ejercicios.RUTA_CSV = ruta_csv
+        salida = io.StringIO()
+        with contextlib.redirect_stdout(salida):
+            if crear:
+                ejercicios.crear_tabla()
+            if incremental:
+                ejercicios.cargar_incremental()
+            else:
+                ejercicios.cargar_datos()
+        return salida.getvalue()
+
+    def contenido(self, ruta_db):
+        conn = sqlite3.connect(ruta_db)
+        try:
+            return {
+                consulta: collections.Counter(conn.execute(consulta).fetchall())
+                for consulta in (CONSULTA_CASOS, CONSULTA_CUBO, CONSULTA_CUBO_DEPARTAMENTOS)
+            }
+        finally:
+            conn.close()
+
+    # Cada cubo tiene que tener los conteos de casos, también después de que una carga
+    # incremental le sumó y le restó los cambios en lugar de rearmarlo
+    def assertCubosComoCasos(self, ruta_db):
+        conn = sqlite3.connect(ruta_db)
+        try:
+            for tabla, columnas in ejercicios.CUBOS.items():
+                columnas = ", ".join(columnas)
+                cubo = conn.execute(f"SELECT {columnas}, cantidad FROM {tabla}").fetchall()
+                casos = conn.execute(f"SELECT {columnas}, COUNT(*) FROM casos GROUP BY {columnas}").fetchall()
+                self.assertEqual(collections.Counter(cubo), collections.Counter(casos), tabla)
+        finally:
+            conn.close()
+
+    # Una versión nueva del archivo: dentro de la ventana se borran y se modifican
+    # algunas filas, y se agregan casos de días posteriores a la última carga
+    def refresco(self):
+        nuevas = []
+        for i, fila in enumerate(self.filas):
+            en_ventana = not fila[11] or fila[11] >= self.corte
+            if en_ventana and i % 17 == 0:
+                continue
+            if en_ventana and i % 13 == 0:
+                fila = fila[:7] + ["SI" if fila[7] == "NO" else "NO"] + fila[8:]
+            nuevas.append(fila)
+        for i, fila in enumerate(self.filas[:300]):
+            dia = self.fecha_maxima + datetime.timedelta(days=1 + i % 3)
+            nuevas.append(fila[:11] + [dia.isoformat()])
+        return nuevas
+
+    def test_igual_a_una_carga_completa(self):
+        self.escribir("refresco.csv", self.refresco())
+        self.cargar("incremental.db", "original.csv", crear=True)
+        salida = self.cargar("incremental.db", "refresco.csv", incremental=True)
+        self.cargar("completa.db", "refresco.csv", crear=True)
+
+        self.assertIn("Carga incremental", salida)
+        self.assertNotIn("haga una carga completa", salida)
+        self.assertEqual(self.contenido("incremental.db"), self.contenido("completa.db"))
+        self.assertCubosComoCasos("incremental.db")
+
+    def test_sin_cambios_no_escribe(self):
+        self.cargar("covid.db", "original.csv", crear=True)
+        antes = self.contenido("covid.db")
+        salida = self.cargar("covid.db", "original.csv", incremental=True)
+
+        self.assertIn("0 filas nuevas, 0 borradas", salida)
+        self.assertEqual(self.contenido("covid.db"), antes)
+        self.assertCubosComoCasos("covid.db")
+
+    # Una corrección que lleva la fecha de una fila de la ventana a antes del corte
+    # no se puede aplicar de forma incremental: tiene que avisar
+    def test_fecha_corregida_hacia_atras_avisa(self):
+        filas = [list(fila) for fila in self.filas]
+        movida = next(fila for fila in filas if fila[11] and fila[11] >= self.corte)
+        movida[11] = min(fila[11] for fila in filas if fila[11])
+        self.escribir("corregido.csv", filas)
+
+        self.cargar("covid.db", "original.csv", crear=True)
+        salida = self.cargar("covid.db", "corregido.csv", incremental=True)
+
+        self.assertIn("⚠️ 1 filas con fecha anterior", salida)
+        self.assertIn("haga una carga completa", salida)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Covid19Casos"))
+
+import benchmark
+import ejercicios
+
+FILAS = 20000
+# Lotes y rangos chicos, para que la carga en serie y la paralela corten las filas en
+# lotes distintos
+TAMANO_LOTE = 1000
+TAMANO_RANGO = 64 * 1024
+CADA_RECHAZO = 1500  # cada cuántas líneas se agrega una fila sin 12 columnas
+TABLAS = ["casos", "sexos", "provincias", "departamentos", "clasificaciones", "cubo", "cubo_departamentos", "calidad"]
+
+
+class CargaParalelaTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp()
+        anterior = os.getcwd()
+        guardados = {nombre: getattr(ejercicios, nombre) for nombre in ["RUTA_DB", "RUTA_CSV", "TAMANO_RANGO"]}
+        os.chdir(cls.directorio)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmark.generar_csv("casos.csv", FILAS, semilla=11)
+                cls.agregar_rechazos("casos.csv")
+                ejercicios.RUTA_CSV = "casos.csv"
+                ejercicios.TAMANO_RANGO = TAMANO_RANGO
+                for ruta_db, procesos in [("serie.db", 1), ("paralela.db", 2)]:
+                    ejercicios.RUTA_DB = ruta_db
+                    ejercicios.crear_tabla()
+                    ejercicios.cargar_datos(tamano_lote=TAMANO_LOTE, ruta_rechazos=f"rechazos_{procesos}.csv",
+                                            procesos=procesos)
+        finally:
+            for nombre, valor in guardados.items():
+                setattr(ejercicios, nombre, valor)
+            os.chdir(anterior)
+
+    # Filas rotas repartidas por todo el archivo, así caen en distintos rangos
+    @staticmethod
+    def agregar_rechazos(ruta):
+        with open(ruta, encoding="utf-8", newline="") as archivo:
+            lineas = archivo.readlines()
+        for i in range(len(lineas) - 1, 0, -CADA_RECHAZO):
+            lineas.insert(i, f'"F","{i}","Años"\n')
+        with open(ruta, "w", encoding="utf-8", newline="") as archivo:
+            archivo.writelines(lineas)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directorio)
+
+    # Filas de una consulta en cada base: (serie, paralela)
+    def consultar(self, consulta):
+        filas = []
+        for ruta_db in ["serie.db", "paralela.db"]:
+            conn = sqlite3.connect(os.path.join(self.directorio, ruta_db))
+            try:
+                filas.append(conn.execute(consulta).fetchall())
+            finally:
+                conn.close()
+        return filas
+
+    def test_mismas_tablas(self):
+        for tabla in TABLAS:
+            serie, paralela = self.consultar(f"SELECT * FROM {tabla} ORDER BY rowid")
+            self.assertTrue(serie, tabla)
+            self.assertEqual(serie, paralela, tabla)
+
+    def test_mismos_rechazos(self):
+        rechazos = []
+        for procesos in [1, 2]:
+            with open(os.path.join(self.directorio, f"rechazos_{procesos}.csv"), encoding="utf-8") as archivo:
+                rechazos.append(archivo.read())
+        self.assertEqual(rechazos[0].count("\n"), 1 + FILAS // CADA_RECHAZO + 1)
+        self.assertEqual(rechazos[0], rechazos[1])
+
+    def test_mismos_bosquejos(self):
+        for consulta in ["SELECT * FROM bosquejos ORDER BY variable, tipo",
+                         "SELECT * FROM estratos ORDER BY provincia_id, sexo_id",
+                         "SELECT * FROM muestra ORDER BY rowid"]:
+            serie, paralela = self.consultar(consulta)
+            self.assertTrue(serie)
+            self.assertEqual(serie, paralela, consulta)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import collections
+import contextlib
+import io
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Covid19Casos"))
+
+import benchmark
+import ejercicios
+
+FILAS = 20000
+
+
+# Los reportes leen el cubo de conteos; estas pruebas comparan lo que sale de él con
+# lo que daba recorrer casos fila por fila, como hacían los reportes originales
+class CuboTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp()
+        anterior = os.getcwd()
+        guardados = {nombre: getattr(ejercicios, nombre) for nombre in ["RUTA_DB", "RUTA_CSV"]}
+        os.chdir(cls.directorio)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmark.generar_csv("casos.csv", FILAS, semilla=5)
+                ejercicios.RUTA_CSV = "casos.csv"
+                ejercicios.RUTA_DB = "covid.db"
+                ejercicios.crear_tabla()
+                ejercicios.cargar_datos()
+        finally:
+            for nombre, valor in guardados.items():
+                setattr(ejercicios, nombre, valor)
+            os.chdir(anterior)
+        cls.conn = sqlite3.connect(os.path.join(cls.directorio, "covid.db"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.conn.close()
+        shutil.rmtree(cls.directorio)
+
+    def consultar(self, nombre, parametros=()):
+        return self.conn.execute(ejercicios.CONSULTAS[nombre], parametros).fetchall()
+
+    # Casos con sus textos: (provincia, sexo, clasificación, edad, fallecido)
+    def casos(self):
+        return self.conn.execute("""
+            SELECT p.nombre, s.codigo, cl.nombre, c.edad, c.fallecido
+            FROM casos c
+            LEFT JOIN provincias p ON p.id = c.residencia_provincia_id
+            LEFT JOIN sexos s ON s.id = c.sexo_id
+            LEFT JOIN clasificaciones cl ON cl.id = c.clasificacion_id
+        """).fetchall()
+
+    # Cuartiles y outliers como en el reporte original: ordenando todas las edades
+    @staticmethod
+    def cuartiles_de_lista(edades):
+        edades = sorted(edades)
+        n = len(edades)
+        if n < 4:
+            return None
+        Q1 = edades[n // 4]
+        Q3 = edades[3 * n // 4]
+        IQR = Q3 - Q1
+        lim_inf, lim_sup = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
+        outliers = [edad for edad in edades if edad < lim_inf or edad > lim_sup]
+        return (Q1, Q3, IQR, lim_inf, lim_sup), (len(outliers), outliers[:10])
+
+    @staticmethod
+    def cuartiles_de_frecuencias(frecuencias):
+        cuartiles = ejercicios.calcular_cuartiles(frecuencias)
+        if cuartiles is None:
+            return None
+        return cuartiles, ejercicios.contar_outliers(frecuencias, cuartiles[3], cuartiles[4])
+
+    def test_cuartiles_y_outliers_de_fallecidos(self):
+        edades = [edad for _, _, _, edad, fallecido in self.casos() if fallecido == 1 and edad is not None]
+        self.assertGreater(len(edades), 100)
+        self.assertEqual(self.cuartiles_de_frecuencias(self.consultar("punto3_frecuencia_edades_fallecidos")),
+                         self.cuartiles_de_lista(edades))
+
+    def test_cuartiles_de_fallecidos_por_provincia(self):
+        edades = collections.defaultdict(list)
+        for provincia, _, _, edad, fallecido in self.casos():
+            if fallecido == 1 and edad is not None:
+                edades[provincia].append(edad)
+        frecuencias = collections.defaultdict(list)
+        for provincia, edad, cantidad in self.consultar("frecuencia_edades_fallecidos_por_provincia"):
+            frecuencias[provincia].append((edad, cantidad))
+
+        self.assertEqual(set(frecuencias), set(edades))
+        for provincia, lista in edades.items():
+            self.assertEqual(self.cuartiles_de_frecuencias(frecuencias[provincia]), self.cuartiles_de_lista(lista), provincia)
+
+    def test_promedio_de_fallecidos_por_provincia(self):
+        edades = collections.defaultdict(list)
+        for provincia, _, _, edad, fallecido in self.casos():
+            if provincia is not None and fallecido == 1 and edad is not None:
+                edades[provincia].append(edad)
+        promedios = dict(self.consultar("punto3_promedio_por_provincia"))
+
+        self.assertEqual(set(promedios), set(edades))
+        for provincia, lista in edades.items():
+            self.assertAlmostEqual(promedios[provincia], sum(lista) / len(lista), places=9, msg=provincia)
+
+    def test_edades_de_confirmados(self):
+        esperado = collections.Counter(
+            edad for _, _, clasificacion, edad, _ in self.casos()
+            if clasificacion is not None and ejercicios.es_confirmado(clasificacion) and edad is not None and 0 <= edad <= 120
+        )
+        self.assertEqual(dict(self.consultar("punto4_frecuencia_edades_confirmados")), esperado)
+
+    def test_edades_por_sexo(self):
+        mujeres_fallecidas = collections.Counter()
+        hombres = collections.Counter()
+        hombres_fallecidos = collections.Counter()
+        for _, sexo, _, edad, fallecido in self.casos():
+            if edad is None or not 0 <= edad <= 120:
+                continue
+            if sexo == "F" and fallecido == 1:
+                mujeres_fallecidas[edad] += 1
+            elif sexo == "M":
+                hombres[edad] += 1
+                hombres_fallecidos[edad] += fallecido == 1
+
+        self.assertEqual(dict(self.consultar("punto5_frecuencia_mujeres_fallecidas")), mujeres_fallecidas)
+        self.assertEqual({edad: (total, fallecidos) for edad, total, fallecidos in self.consultar("punto5_frecuencia_hombres")},
+                         {edad: (total, hombres_fallecidos[edad]) for edad, total in hombres.items()})
+
+    def test_provincia_con_mas_confirmados(self):
+        for sexo in ["F", "M"]:
+            confirmados = collections.Counter(
+                provincia for provincia, sexo_caso, clasificacion, _, _ in self.casos()
+                if provincia is not None and sexo_caso == sexo
+                and clasificacion is not None and ejercicios.es_confirmado(clasificacion)
+            )
+            (provincia, cantidad), = self.consultar("punto6_provincia_con_mas_confirmados", (sexo,))
+            self.assertEqual(cantidad, max(confirmados.values()), sexo)
+            self.assertEqual(confirmados[provincia], cantidad, sexo)
+
+
+if __name__ == "__main__":
+    unittest.main()
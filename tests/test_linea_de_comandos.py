@@ -0,0 +1,66 @@
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Covid19Casos")
+sys.path.insert(0, DIRECTORIO)
+
+import benchmark
+import ejercicios
+
+FILAS = 2000
+REPORTES = ["punto1", "punto3"]
+
+
+# Con --formato json, stdout tiene que tener solo los datos: las tablas y los avisos
+# (también los de --parquet y --aproximado) van a stderr
+class LineaDeComandosTest(unittest.TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        with contextlib.redirect_stdout(io.StringIO()):
+            benchmark.generar_csv(os.path.join(self.directorio, "casos.csv"), FILAS, semilla=7)
+        self.ejecutar("init")
+        self.ejecutar("load")
+
+    # Corre ejercicios.py en el directorio de la prueba y devuelve su stdout
+    def ejecutar(self, *argumentos):
+        resultado = subprocess.run(
+            [sys.executable, os.path.join(DIRECTORIO, "ejercicios.py"), "--db", "covid.db", "--csv", "casos.csv", *argumentos],
+            cwd=self.directorio, capture_output=True, text=True, encoding="utf-8",
+            env={**os.environ, "PYTHONIOENCODING": "utf-8"},
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        return resultado.stdout
+
+    def reporte_json(self, *opciones):
+        datos = json.loads(self.ejecutar("report", *REPORTES, "--formato", "json", *opciones))
+        self.assertEqual(list(datos), REPORTES)
+        return datos
+
+    def test_json(self):
+        self.reporte_json()
+
+    def test_json_aproximado(self):
+        self.reporte_json("--aproximado")
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "hace falta pyarrow")
+    def test_json_parquet(self):
+        self.addCleanup(setattr, ejercicios, "RUTA_CSV", ejercicios.RUTA_CSV)
+        ejercicios.RUTA_CSV = os.path.join(self.directorio, "casos.csv")
+        with contextlib.redirect_stdout(io.StringIO()):
+            ejercicios.convertir_a_parquet(os.path.join(self.directorio, ejercicios.RUTA_PARQUET),
+                                           ruta_rechazos=os.path.join(self.directorio, "rechazos.csv"))
+
+        self.assertEqual(self.reporte_json("--parquet")["punto3"], self.reporte_json()["punto3"])
+
+
+if __name__ == "__main__":
+    unittest.main()